@@ -0,0 +1,202 @@
+import datetime
+
+import numpy as np
+
+from metrics import timed
+
+
+def date_to_day(date_str):
+    """Day ordinal of a YYYY-MM-DD string, or 0 if the stored date can't be parsed."""
+    try:
+        return datetime.date.fromisoformat(date_str).toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+
+def day_to_date(day):
+    return datetime.date.fromordinal(day).isoformat() if day else ""
+
+
+class SalesFrame:
+    """Sales as parallel NumPy columns with dictionary-encoded text fields.
+
+    customer/model/color hold codes into customer_ids/models/colors, day holds
+    date ordinals and quantity the (possibly pre-summed) quantities. Rows can
+    be raw sales or rollup buckets; every aggregation here is a sum, so both
+    give the same answers.
+    """
+
+    def __init__(self, customer_ids, models, colors, customer, model, color, day, quantity):
+        self.customer_ids = list(customer_ids)
+        self.models = list(models)
+        self.colors = list(colors)
+        self.customer = np.asarray(customer, dtype=np.int32)
+        self.model = np.asarray(model, dtype=np.int32)
+        self.color = np.asarray(color, dtype=np.int32)
+        self.day = np.asarray(day, dtype=np.int32)
+        self.quantity = np.asarray(quantity, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.day)
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], [], [], [], [])
+
+    @classmethod
+    @timed()
+    def from_buckets(cls, buckets):
+        """Build from a {(date, customer_id, bike_model, color): qty} mapping."""
+        customers, models, colors, days = {}, {}, {}, {}
+        n = len(buckets)
+        customer = np.empty(n, dtype=np.int32)
+        model = np.empty(n, dtype=np.int32)
+        color = np.empty(n, dtype=np.int32)
+        day = np.empty(n, dtype=np.int32)
+        quantity = np.empty(n, dtype=np.int64)
+
+        for i, ((date, customer_id, bike_model, bike_color), qty) in enumerate(buckets.items()):
+            customer[i] = customers.setdefault(customer_id, len(customers))
+            model[i] = models.setdefault(bike_model, len(models))
+            color[i] = colors.setdefault(bike_color, len(colors))
+            if date not in days:
+                days[date] = date_to_day(date)
+            day[i] = days[date]
+            quantity[i] = qty
+        return cls(customers, models, colors, customer, model, color, day, quantity)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Wrap a columnar snapshot; the column buffers are read straight from the mapping."""
+        buffer = snapshot._mmap
+        rows = snapshot.rows
+
+        def column(name, dtype):
+            return np.frombuffer(buffer, dtype=dtype, count=rows, offset=snapshot.offsets[name])
+
+        return cls(snapshot.customers, snapshot.models, snapshot.colors,
+                   column("customer", np.int32), column("model", np.int16), column("color", np.int16),
+                   column("day", np.int32), column("quantity", np.int32))
+
+    @classmethod
+    @timed()
+    def concat(cls, frames):
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return cls.empty()
+        if len(frames) == 1:
+            return frames[0]
+
+        merged = {"customer": {}, "model": {}, "color": {}}
+        columns = {"customer": [], "model": [], "color": []}
+        for frame in frames:
+            for field, values in (("customer", frame.customer_ids), ("model", frame.models),
+                                  ("color", frame.colors)):
+                codes = merged[field]
+                # Translate this frame's codes into the merged dictionary with one lookup array
+                remap = np.array([codes.setdefault(value, len(codes)) for value in values], dtype=np.int32)
+                columns[field].append(remap[getattr(frame, field)] if len(remap) else getattr(frame, field))
+
+        return cls(merged["customer"], merged["model"], merged["color"],
+                   np.concatenate(columns["customer"]), np.concatenate(columns["model"]),
+                   np.concatenate(columns["color"]),
+                   np.concatenate([frame.day for frame in frames]),
+                   np.concatenate([frame.quantity for frame in frames]))
+
+    def buckets(self):
+        """{(date, customer_id, bike_model, color): qty}; the inverse of from_buckets."""
+        buckets = {}
+        dates = {}
+        for c, m, k, d, qty in zip(self.customer.tolist(), self.model.tolist(), self.color.tolist(),
+                                   self.day.tolist(), self.quantity.tolist()):
+            if d not in dates:
+                dates[d] = day_to_date(d)
+            key = (dates[d], self.customer_ids[c], self.models[m], self.colors[k])
+            buckets[key] = buckets.get(key, 0) + qty
+        return buckets
+
+    def range_mask(self, start, end):
+        """Rows dated start..end; empty if either bound isn't a date. Unparseable sale dates (day 0) never match."""
+        first, last = date_to_day(start), date_to_day(end)
+        if not first or not last:
+            return np.zeros(len(self.day), dtype=bool)
+        return (self.day >= first) & (self.day <= last)
+
+
+def _masked(frame, mask, *columns):
+    if mask is None:
+        return [getattr(frame, name) for name in columns]
+    return [getattr(frame, name)[mask] for name in columns]
+
+
+@timed("aggregate.customer_model_matrix")
+def customer_model_matrix(frame, mask=None):
+    """Quantity matrix with one row per customer code and one column per model code."""
+    customer, model, quantity = _masked(frame, mask, "customer", "model", "quantity")
+    n_customers, n_models = len(frame.customer_ids), len(frame.models)
+    if n_customers == 0 or n_models == 0:
+        return np.zeros((n_customers, n_models), dtype=np.int64)
+    index = customer.astype(np.int64) * n_models + model
+    counts = np.bincount(index, weights=quantity, minlength=n_customers * n_models)
+    return counts.astype(np.int64).reshape(n_customers, n_models)
+
+
+@timed("aggregate.model_totals")
+def model_totals(frame, mask=None):
+    model, quantity = _masked(frame, mask, "model", "quantity")
+    counts = np.bincount(model, weights=quantity, minlength=len(frame.models)).astype(np.int64)
+    return {name: int(counts[code]) for code, name in enumerate(frame.models) if counts[code]}
+
+
+@timed("aggregate.daily_totals")
+def daily_totals(frame, mask=None):
+    """(day ordinals, totals) for every day that has sales, in date order."""
+    day, quantity = _masked(frame, mask, "day", "quantity")
+    days, inverse = np.unique(day, return_inverse=True)
+    return days, np.bincount(inverse, weights=quantity, minlength=len(days)).astype(np.int64)
+
+
+def customer_mask(frame, customer_id):
+    try:
+        code = frame.customer_ids.index(customer_id)
+    except ValueError:
+        return np.zeros(len(frame), dtype=bool)
+    return frame.customer == code
+
+
+@timed("aggregate.customer_total")
+def customer_total(frame, customer_id, start, end):
+    mask = frame.range_mask(start, end) & customer_mask(frame, customer_id)
+    return int(frame.quantity[mask].sum())
+
+
+@timed("aggregate.daily_cells")
+def daily_cells(frame, mask=None):
+    """{(date, bike_model, color): qty} summed over customers, via one np.unique over a packed key."""
+    if mask is None:
+        mask = frame.day > 0  # unparseable sale dates have no day to go in
+    else:
+        mask = mask & (frame.day > 0)
+    day, model, color, quantity = _masked(frame, mask, "day", "model", "color", "quantity")
+    n_models, n_colors = len(frame.models) or 1, len(frame.colors) or 1
+    keys = (day.astype(np.int64) * n_models + model) * n_colors + color
+    unique, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=quantity, minlength=len(unique)).astype(np.int64)
+
+    unique, color_codes = np.divmod(unique, n_colors)
+    days, model_codes = np.divmod(unique, n_models)
+    dates = {}
+    cells = {}
+    for d, m, k, qty in zip(days.tolist(), model_codes.tolist(), color_codes.tolist(), totals.tolist()):
+        if d not in dates:
+            dates[d] = day_to_date(d)
+        cells[(dates[d], frame.models[m], frame.colors[k])] = qty
+    return cells
+
+
+@timed("aggregate.customer_model_totals")
+def customer_model_totals(frame, mask=None):
+    """{(customer_id, bike_model): qty} for the non-zero cells of the matrix."""
+    matrix = customer_model_matrix(frame, mask)
+    rows, cols = np.nonzero(matrix)
+    return {(frame.customer_ids[r], frame.models[c]): int(matrix[r, c]) for r, c in zip(rows, cols)}
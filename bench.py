@@ -0,0 +1,270 @@
+import argparse
+import csv
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from catalog import BIKE_COLORS, BIKE_MODELS
+from metrics import percentile
+from rollup import SALES_FIELDS
+
+FIRST_NAMES = ["Muhammad", "Ali", "Umer", "Usman", "Ahmed", "Bilal", "Hamza", "Zain", "Imran", "Tariq",
+               "Khawaja", "Asif", "Kashif", "Nadeem", "Shahid", "Faisal", "Rizwan", "Adnan", "Waqas", "Sajid"]
+LAST_NAMES = ["Azam", "Khan", "Butt", "Malik", "Sheikh", "Chaudhry", "Qureshi", "Raza", "Iqbal", "Hussain",
+              "Javed", "Akhtar", "Mirza", "Siddiqui", "Aslam", "Rana", "Baig", "Anwar", "Nawaz", "Saleem"]
+BUSINESSES = ["", "", "", " Motors", " Autos", " Traders", " Royal Center", " & Sons", " Bike Point", " Enterprises"]
+
+# Most sales are single bikes; dealers sometimes take a few at once
+QUANTITIES = [1, 1, 1, 1, 1, 1, 2, 2, 3, 5]
+
+
+def month_start(day, months_back):
+    index = day.year * 12 + day.month - 1 - months_back
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def customer_names(count, rng):
+    names = []
+    seen = set()
+    while len(names) < count:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}{rng.choice(BUSINESSES)}"
+        if name in seen:
+            name = f"{name} {len(names) + 1}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def pick_customer(customers, rng):
+    # A few regular dealers (the first 5% of ids) account for a third of the sales
+    if rng.random() < 0.3:
+        return rng.randint(1, max(1, customers // 20))
+    return rng.randint(1, customers)
+
+
+def write_sales(path, count, first_day, last_day, customers, rng):
+    days = (last_day - first_day).days + 1
+    dates = [(first_day + datetime.timedelta(days=i)).isoformat() for i in range(days)]
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(SALES_FIELDS)
+        for start in range(0, count, 10000):
+            writer.writerows(
+                (pick_customer(customers, rng), rng.choice(BIKE_MODELS), rng.choice(BIKE_COLORS),
+                 rng.choice(QUANTITIES), rng.choice(dates))
+                for _ in range(min(10000, count - start))
+            )
+
+
+def generate(data_dir, sales, customers, months=12, seed=0, today=None):
+    """Write a data folder with `customers` customers and `sales` sales.
+
+    The sales are spread over `months` months ending with the current one:
+    closed months go to sales_YYYY-MM.csv archives, the open month to
+    sales.csv. The same seed always produces the same files.
+    """
+    rng = random.Random(seed)
+    today = today or datetime.date.today()
+    os.makedirs(data_dir, exist_ok=True)
+
+    with open(os.path.join(data_dir, "customers.csv"), "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["id", "name"])
+        writer.writerows(enumerate(customer_names(customers, rng), 1))
+
+    per_month = [sales // months + (1 if i < sales % months else 0) for i in range(months)]
+    for back, count in zip(range(months - 1, -1, -1), per_month):
+        first_day = month_start(today, back)
+        if back == 0:
+            write_sales(os.path.join(data_dir, "sales.csv"), count, first_day, today, customers, rng)
+        else:
+            last_day = month_start(today, back - 1) - datetime.timedelta(days=1)
+            path = os.path.join(data_dir, f"sales_{first_day:%Y-%m}.csv")
+            write_sales(path, count, first_day, last_day, customers, rng)
+
+    with open(os.path.join(data_dir, "monthly_sales.csv"), "w") as file:
+        file.write(f"{today:%Y-%m}")
+
+
+def stats(samples):
+    total = sum(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": total / len(samples),
+        "p50_ms": percentile(samples, 0.5),
+        "p95_ms": percentile(samples, 0.95),
+        "p99_ms": percentile(samples, 0.99),
+        "max_ms": max(samples),
+        "ops_per_s": len(samples) / (total / 1000) if total else None,
+    }
+
+
+class Bench:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = {}
+
+    def measure(self, name, operation, repeat=None):
+        samples = []
+        for i in range(repeat or self.repeat):
+            started = time.perf_counter()
+            operation(i)
+            samples.append((time.perf_counter() - started) * 1000)
+        self.results[name] = stats(samples)
+        print(f"{name:<24}p50 {self.results[name]['p50_ms']:9.2f} ms", file=sys.stderr)
+
+
+def run(data_dir, repeat=50, writes=20, seed=0):
+    """Time each data path the app uses against the data folder; returns {name: stats}."""
+    from cube import STEPS, SalesCube
+    from search import CustomerIndex
+    from storage import open_storage
+    from summary import summary_values
+
+    rng = random.Random(seed)
+    bench = Bench(repeat)
+    today = datetime.date.today()
+    today_str = today.isoformat()
+    week_start = (today - datetime.timedelta(days=6)).isoformat()
+    month_start_str = f"{today:%Y-%m}-01"
+
+    # Cold start: a fresh storage object answering the Home screen
+    def cold_home(_i):
+        fresh = open_storage(data_dir)
+        fresh.model_totals_for_date(today_str)
+        fresh.last_sale_for_date(today_str)
+
+    bench.measure("cold_home", cold_home, repeat=min(repeat, 3))
+
+    storage = open_storage(data_dir)
+    ids = list(storage.customer_names_by_id())
+
+    def home(_i):
+        storage.model_totals_for_date(today_str)
+        sale = storage.last_sale_for_date(today_str)
+        if sale is not None:
+            storage.customer_name(sale["customer_id"])
+
+    bench.measure("home_data", home)
+    ranges = [("today", today_str), ("7_days", week_start), ("month", month_start_str), ("all", datetime.date.min.isoformat())]
+    for label, start in ranges:
+        bench.measure(f"customer_total_{label}",
+                      lambda _i, start=start: storage.customer_total(rng.choice(ids), start, today_str))
+    bench.measure("summary", lambda _i: summary_values(storage), repeat=min(repeat, 10))
+    bench.measure("sales_totals_year", lambda _i: storage.sales_totals(f"{today.year}-01-01", today_str),
+                  repeat=min(repeat, 10))
+    first_date, last_date = datetime.date.min.isoformat(), datetime.date.max.isoformat()
+    bench.measure("daily_cells_all", lambda _i: storage.daily_cells(first_date, last_date), repeat=min(repeat, 10))
+    cube = SalesCube.from_cells(storage.daily_cells(first_date, last_date))
+    bench.measure("trend_series", lambda i: cube.series(cube.first_date, cube.last_date, STEPS[i % len(STEPS)]))
+
+    names = storage.customer_names()
+    index = None
+
+    def build_index(_i):
+        nonlocal index
+        index = CustomerIndex(names)
+
+    bench.measure("customer_index_build", build_index, repeat=1)
+    queries = [name[:rng.randint(1, 6)] for name in rng.sample(names, min(len(names), repeat))]
+    bench.measure("customer_search", lambda i: index.search(queries[i % len(queries)], 8))
+    bench.measure("similar_names", lambda i: index.similar(names[i % len(names)] + "s"))
+
+    # Writes last: they change the data folder
+    def add_customer(i):
+        name = f"Bench Customer {seed}-{i}"
+        index.similar(name)
+        storage.add_customer(name)
+        index.add(name)
+
+    def add_sale(_i):
+        storage.add_sales([
+            {"customer_id": rng.choice(ids), "bike_model": rng.choice(BIKE_MODELS), "color": rng.choice(BIKE_COLORS),
+             "quantity": str(rng.choice(QUANTITIES)), "sale_date": today_str}
+            for _ in range(rng.randint(1, 3))
+        ])
+
+    bench.measure("add_customer", add_customer, repeat=writes)
+    bench.measure("add_sale", add_sale, repeat=writes)
+    bench.measure("home_after_sale", lambda i: (add_sale(i), home(i)), repeat=writes)
+    return bench.results
+
+
+def git_commit():
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the data paths on synthetic data, headlessly. Prints JSON results.")
+    parser.add_argument("--sales", type=int, default=100000, help="sales to generate (default: %(default)s)")
+    parser.add_argument("--customers", type=int, default=1000, help="customers to generate (default: %(default)s)")
+    parser.add_argument("--months", type=int, default=12, help="months of history, including the open one")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--repeat", type=int, default=50, help="samples per read benchmark (default: %(default)s)")
+    parser.add_argument("--writes", type=int, default=20, help="samples per write benchmark (default: %(default)s)")
+    parser.add_argument("--data-dir", help="generate into (or, with --reuse, benchmark) this folder instead of a "
+                                           "temporary one; it is kept afterwards")
+    parser.add_argument("--reuse", action="store_true", help="benchmark the existing --data-dir as it is")
+    parser.add_argument("--out", help="write the JSON here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.reuse and not args.data_dir:
+        raise SystemExit("--reuse needs --data-dir")
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="bikestock-bench-")
+
+    try:
+        generate_seconds = None
+        if not args.reuse:
+            started = time.perf_counter()
+            generate(data_dir, args.sales, args.customers, args.months, args.seed)
+            if args.backend == "sqlite":
+                from storage import migrate_csv_to_sqlite
+                migrate_csv_to_sqlite(data_dir)
+            generate_seconds = time.perf_counter() - started
+
+        report = {
+            "meta": {
+                "sales": None if args.reuse else args.sales,
+                "customers": None if args.reuse else args.customers,
+                "months": None if args.reuse else args.months,
+                "seed": args.seed,
+                "backend": args.backend,
+                "generate_s": generate_seconds,
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "results": run(data_dir, args.repeat, args.writes, args.seed),
+        }
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
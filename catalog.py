@@ -0,0 +1,3 @@
+# Models and colours offered on the Add Sale form; imports are validated against these too
+BIKE_MODELS = ["CD 70", "CG 125", "CD 70 Dream", "Pridor", "CG 125S", "CG 125S GOLD"]
+BIKE_COLORS = ["Red", "Black", "Blue", "Silver"]
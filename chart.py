@@ -0,0 +1,90 @@
+import tkinter as tk
+
+import customtkinter as ctk
+
+# One line colour per series; models and colours are few, so this never wraps in practice
+LINE_COLORS = ["#EF4444", "#F59E0B", "#10B981", "#3B82F6", "#A855F7", "#EC4899", "#14B8A6", "#EAB308"]
+MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 60, 20, 30, 40
+GRID_LINES = 4
+X_LABELS = 8
+
+
+class TrendChart(ctk.CTkFrame):
+    """Line chart on a plain Tk canvas, one line per series.
+
+    set_series() takes data that is already bucketed, so a redraw (on resize
+    or new data) is a handful of canvas items whatever range it covers.
+    Hovering shows the values of the bucket under the pointer.
+    """
+
+    def __init__(self, master, font=("Segoe UI", 11), **kwargs):
+        kwargs.setdefault("fg_color", "#1E1E1E")
+        super().__init__(master, **kwargs)
+        self.font = font
+        self.labels = []
+        self.series = {}
+        self.canvas = tk.Canvas(self, bg="#1E1E1E", highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True, padx=10, pady=10)
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.canvas.bind("<Motion>", self._on_motion)
+        self.canvas.bind("<Leave>", lambda event: self.canvas.delete("hover"))
+
+    def set_series(self, labels, series):
+        self.labels = labels
+        self.series = {name: values for name, values in series.items() if any(values)}
+        self.redraw()
+
+    def _plot_area(self):
+        right = max(self.canvas.winfo_width() - MARGIN_RIGHT, MARGIN_LEFT + 1)
+        bottom = max(self.canvas.winfo_height() - MARGIN_BOTTOM, MARGIN_TOP + 1)
+        return MARGIN_LEFT, MARGIN_TOP, right, bottom
+
+    def _x(self, i, left, right):
+        return left + (right - left) * (i / max(len(self.labels) - 1, 1))
+
+    def redraw(self):
+        canvas = self.canvas
+        canvas.delete("all")
+        left, top, right, bottom = self._plot_area()
+        if not self.labels or not self.series:
+            canvas.create_text((left + right) / 2, (top + bottom) / 2, text="No sales in this range",
+                               fill="#9CA3AF", font=self.font)
+            return
+
+        peak = max(max(values) for values in self.series.values()) or 1
+        scale = (bottom - top) / peak
+        for step in range(GRID_LINES + 1):
+            y = bottom - (bottom - top) * step / GRID_LINES
+            canvas.create_line(left, y, right, y, fill="#2A2A2A")
+            canvas.create_text(left - 8, y, text=f"{peak * step / GRID_LINES:g}", anchor="e",
+                               fill="#9CA3AF", font=self.font)
+        every = max(1, -(-len(self.labels) // X_LABELS))
+        for i in range(0, len(self.labels), every):
+            canvas.create_text(self._x(i, left, right), bottom + 8, text=self.labels[i], anchor="n",
+                               fill="#9CA3AF", font=self.font)
+
+        for n, (name, values) in enumerate(self.series.items()):
+            color = LINE_COLORS[n % len(LINE_COLORS)]
+            points = []
+            for i, value in enumerate(values):
+                points += [self._x(i, left, right), bottom - value * scale]
+            if len(points) == 2:  # a single bucket: draw a dot instead of a line
+                x, y = points
+                canvas.create_oval(x - 3, y - 3, x + 3, y + 3, fill=color, outline=color)
+            else:
+                canvas.create_line(*points, fill=color, width=2)
+            canvas.create_text(left + 10 + 110 * n, top - 15, text=f"■ {name}", anchor="w", fill=color,
+                               font=self.font)
+
+    def _on_motion(self, event):
+        self.canvas.delete("hover")
+        left, top, right, bottom = self._plot_area()
+        if not self.labels or not self.series or not left <= event.x <= right:
+            return
+        i = round((event.x - left) / (right - left) * max(len(self.labels) - 1, 1))
+        x = self._x(i, left, right)
+        lines = [self.labels[i]] + [f"{name}: {values[i]}" for name, values in self.series.items()]
+        self.canvas.create_line(x, top, x, bottom, fill="#6B7280", dash=(2, 2), tags="hover")
+        anchor = "nw" if x < (left + right) / 2 else "ne"
+        self.canvas.create_text(x + (8 if anchor == "nw" else -8), top + 5, text="\n".join(lines), anchor=anchor,
+                                fill="white", font=self.font, tags="hover")
@@ -0,0 +1,130 @@
+import argparse
+import datetime
+import os
+import sys
+
+from importer import DEFAULT_BATCH_SIZE, import_customers, import_sales
+from report import FORMATS, Report, write_report
+from rollover import verify
+from server import DEFAULT_HOST, DEFAULT_PORT, run_server
+from storage import DATA_DIR, migrate_csv_to_sqlite, open_storage
+
+
+def cmd_migrate(args):
+    # One-shot move from the CSV files to data/bikestock.db
+    skipped = migrate_csv_to_sqlite(args.data_dir)
+    print(f"Migrated {args.data_dir}/ to SQLite.")
+    if skipped:
+        print(f"Skipped {skipped:,} rows without a numeric customer id.")
+
+
+def cmd_import(args):
+    storage = open_storage(args.data_dir, args.server, args.token)
+    if args.kind == "customers":
+        result = import_customers(storage, args.file, batch_size=args.batch_size)
+    else:
+        result = import_sales(storage, args.file, batch_size=args.batch_size,
+                              create_customers=args.create_customers)
+    print(result)
+    if result.rejected:
+        print(f"Rejected rows written to {args.file}.rejected.csv")
+
+
+def cmd_report(args):
+    storage = open_storage(args.data_dir, args.server, args.token)
+    today = datetime.date.today()
+    start = args.start or today.replace(day=1).isoformat()
+    end = args.end or today.isoformat()
+    if start > end:
+        raise SystemExit("--from is after --to")
+    if args.format == "xlsx" and not args.output:
+        raise SystemExit("--format xlsx needs --output")
+    report = Report(storage, start, end, by_month=args.by_month)
+    try:
+        write_report(report, args.format, args.output)
+    except RuntimeError as error:  # optional dependency missing
+        raise SystemExit(str(error))
+    if args.output:
+        print(f"Report written to {args.output}", file=sys.stderr)
+
+
+def cmd_compact(args):
+    storage = open_storage(args.data_dir)
+    storage.roll_over(datetime.date.today().strftime("%Y-%m"))
+    months = storage.compact()
+    print(f"Compacted {len(months or [])} closed month(s).")
+
+
+def cmd_verify(args):
+    problems = 0
+    for month, status in verify(args.data_dir):
+        print(f"{month}  {status}")
+        problems += status == "corrupt"
+    if problems:
+        raise SystemExit(f"{problems} month(s) don't match their checksum")
+
+
+def cmd_serve(args):
+    # Always the local data folder: this is the process that owns it
+    run_server(open_storage(args.data_dir), args.host, args.port, args.token)
+
+
+def iso_date(text):
+    try:
+        return datetime.date.fromisoformat(text).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {text!r}") from None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="Bike Sales System command line tools.")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="data folder (default: %(default)s)")
+    parser.add_argument("--server", default=os.environ.get("BIKESALES_SERVER"),
+                        help="use the data served by `main.py serve` at this URL instead of --data-dir "
+                             "(default: $BIKESALES_SERVER)")
+    parser.add_argument("--token", default=os.environ.get("BIKESALES_TOKEN"),
+                        help="shared secret for the server (default: $BIKESALES_TOKEN)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help="import the CSV files into data/bikestock.db")
+    migrate.set_defaults(func=cmd_migrate)
+
+    load = commands.add_parser("import", help="bulk-load a large customers or sales CSV export")
+    load.add_argument("kind", choices=["sales", "customers"])
+    load.add_argument("file")
+    load.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                      help="rows per write (default: %(default)s)")
+    load.add_argument("--create-customers", action="store_true",
+                      help="add customers named in the sales file that don't exist yet")
+    load.set_defaults(func=cmd_import)
+
+    report = commands.add_parser("report", help="bikes per customer and model for a date range")
+    report.add_argument("--from", dest="start", type=iso_date, help="first day (default: start of this month)")
+    report.add_argument("--to", dest="end", type=iso_date, help="last day, inclusive (default: today)")
+    report.add_argument("--format", choices=FORMATS, default="csv")
+    report.add_argument("--by-month", action="store_true", help="one block of rows per month")
+    report.add_argument("-o", "--output", help="write to this file instead of stdout")
+    report.set_defaults(func=cmd_report)
+
+    compact = commands.add_parser("compact", help="close past months now and compact and checksum the archives")
+    compact.set_defaults(func=cmd_compact)
+
+    check = commands.add_parser("verify", help="check the archived months against their checksums")
+    check.set_defaults(func=cmd_verify)
+
+    serve = commands.add_parser("serve", help="share the data folder with other counters over HTTP")
+    serve.add_argument("--host", default=DEFAULT_HOST,
+                       help="address to listen on (default: %(default)s; 0.0.0.0 for the whole LAN)")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT, help="(default: %(default)s)")
+    serve.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
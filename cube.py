@@ -0,0 +1,129 @@
+import datetime
+
+import numpy as np
+
+from catalog import BIKE_COLORS, BIKE_MODELS
+
+STEPS = ["day", "week", "month"]
+MAX_POINTS = 120  # auto_step() picks the finest step that keeps a chart under this many points
+
+
+def _ordered(names, known):
+    # Catalogue order first, then anything the data has that the catalogue doesn't (old models)
+    return [name for name in known if name in names] + sorted(names - set(known))
+
+
+class SalesCube:
+    """Bikes sold per day, model and colour, with prefix sums over the days.
+
+    cum[i] holds the totals of every day before first + i, so the total of
+    any date range for any model and colour (or all of them) is the
+    difference of two rows, however many years the cube covers. Series for
+    charts are built the same way, one difference per bucket.
+    """
+
+    def __init__(self, first, daily, models, colors):
+        self.first = first  # date ordinal of daily[0]
+        self.models = models
+        self.colors = colors
+        self.cum = np.zeros((len(daily) + 1, len(models), len(colors)), dtype=np.int64)
+        np.cumsum(daily, axis=0, out=self.cum[1:])
+
+    @classmethod
+    def from_cells(cls, cells):
+        """Build from {(date, bike_model, color): qty}, as returned by Storage.daily_cells().
+
+        Cells whose date can't be parsed (free text typed at the counter) are left out.
+        """
+        ordinals = {}
+        for date in {key[0] for key in cells}:
+            try:
+                ordinals[date] = datetime.date.fromisoformat(date).toordinal()
+            except (TypeError, ValueError):
+                pass
+        cells = {key: qty for key, qty in cells.items() if key[0] in ordinals}
+        if not cells:
+            return cls(datetime.date.today().toordinal(), np.zeros((0, 0, 0), dtype=np.int64), [], [])
+        models = _ordered({model for _date, model, _color in cells}, BIKE_MODELS)
+        colors = _ordered({color for _date, _model, color in cells}, BIKE_COLORS)
+        first, last = min(ordinals.values()), max(ordinals.values())
+
+        model_index = {model: i for i, model in enumerate(models)}
+        color_index = {color: i for i, color in enumerate(colors)}
+        daily = np.zeros((last - first + 1, len(models), len(colors)), dtype=np.int64)
+        for (date, model, color), qty in cells.items():
+            daily[ordinals[date] - first, model_index[model], color_index[color]] += qty
+        return cls(first, daily, models, colors)
+
+    @property
+    def first_date(self):
+        return datetime.date.fromordinal(self.first).isoformat()
+
+    @property
+    def last_date(self):
+        return datetime.date.fromordinal(self.first + len(self.cum) - 2).isoformat()
+
+    def __bool__(self):
+        return len(self.cum) > 1
+
+    def _row(self, ordinal):
+        # Row of cum holding everything sold before `ordinal`, clamped to the cube
+        return min(max(ordinal - self.first, 0), len(self.cum) - 1)
+
+    def total(self, start, end, model=None, color=None):
+        """Bikes sold start..end (inclusive); None for model or color means all of them."""
+        first = self._row(datetime.date.fromisoformat(start).toordinal())
+        last = self._row(datetime.date.fromisoformat(end).toordinal() + 1)
+        if last <= first:
+            return 0
+        block = self.cum[last] - self.cum[first]
+        if model is not None:
+            if model not in self.models:
+                return 0
+            block = block[self.models.index(model):self.models.index(model) + 1]
+        if color is not None:
+            if color not in self.colors:
+                return 0
+            block = block[:, self.colors.index(color):self.colors.index(color) + 1]
+        return int(block.sum())
+
+    def series(self, start, end, step="day", by="model"):
+        """(labels, {model or colour: [qty per bucket]}) for start..end in day, week or month buckets."""
+        bounds = list(buckets(start, end, step))
+        labels = [label for label, _first, _last in bounds]
+        edges = [self._row(first) for _label, first, _last in bounds]
+        edges.append(self._row(bounds[-1][2] + 1) if bounds else 0)
+        steps = np.diff(self.cum[edges], axis=0)  # one row per bucket
+        if by == "model":
+            names, values = self.models, steps.sum(axis=2)
+        else:
+            names, values = self.colors, steps.sum(axis=1)
+        return labels, {name: values[:, i].tolist() for i, name in enumerate(names)}
+
+
+def auto_step(start, end, max_points=MAX_POINTS):
+    days = (datetime.date.fromisoformat(end) - datetime.date.fromisoformat(start)).days + 1
+    if days <= max_points:
+        return "day"
+    if days <= max_points * 7:
+        return "week"
+    return "month"
+
+
+def buckets(start, end, step):
+    """(label, first_ordinal, last_ordinal) for each day, week (Monday to Sunday) or month of start..end."""
+    day = datetime.date.fromisoformat(start)
+    last = datetime.date.fromisoformat(end)
+    while day <= last:
+        if step == "day":
+            bucket_end = day
+            label = day.isoformat()
+        elif step == "week":
+            bucket_end = day + datetime.timedelta(days=6 - day.weekday())
+            label = (day - datetime.timedelta(days=day.weekday())).isoformat()
+        else:
+            bucket_end = (day.replace(day=1) + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+            label = day.strftime("%Y-%m")
+        bucket_end = min(bucket_end, last)
+        yield label, day.toordinal(), bucket_end.toordinal()
+        day = bucket_end + datetime.timedelta(days=1)
@@ -0,0 +1,67 @@
+import customtkinter as ctk
+
+
+class CustomerPicker(ctk.CTkFrame):
+    """Entry with a live list of matching customers underneath.
+
+    Drop-in for the customer CTkComboBox: get() returns the chosen name. The
+    list is filled from a CustomerIndex shortly after the user stops typing,
+    and only ever holds `limit` buttons, however many customers there are.
+    """
+
+    DEBOUNCE_MS = 80
+
+    def __init__(self, master, index, width=300, limit=8, font=None, **kwargs):
+        kwargs.setdefault("fg_color", "transparent")
+        super().__init__(master, **kwargs)
+        self.index = index
+        self.limit = limit
+        self._pending = None
+
+        self.entry = ctk.CTkEntry(self, width=width, placeholder_text="Type to search customers", font=font)
+        self.entry.pack()
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.entry.bind("<Return>", self._choose_first)
+
+        self.results = ctk.CTkFrame(self, width=width)
+        self._buttons = []
+        for _ in range(limit):
+            btn = ctk.CTkButton(self.results, text="", width=width, height=26, anchor="w", corner_radius=0,
+                                fg_color="transparent", hover_color="#B91C1C", font=font)
+            self._buttons.append(btn)
+
+    def _on_key(self, event):
+        if event.keysym in ("Return", "Escape"):
+            if event.keysym == "Escape":
+                self.results.pack_forget()
+            return
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+        self._pending = self.after(self.DEBOUNCE_MS, self._refresh)
+
+    def _refresh(self):
+        self._pending = None
+        matches = self.index.search(self.entry.get(), self.limit)
+        if not matches or matches == [self.entry.get().strip()]:
+            self.results.pack_forget()
+            return
+
+        for btn, name in zip(self._buttons, matches):
+            btn.configure(text=name, command=lambda n=name: self.set(n))
+            btn.pack(fill="x")
+        for btn in self._buttons[len(matches):]:
+            btn.pack_forget()
+        self.results.pack(pady=(2, 0))
+
+    def _choose_first(self, event=None):
+        matches = self.index.search(self.entry.get(), 1)
+        if matches:
+            self.set(matches[0])
+
+    def set(self, name):
+        self.entry.delete(0, "end")
+        self.entry.insert(0, name)
+        self.results.pack_forget()
+
+    def get(self):
+        return self.entry.get().strip()
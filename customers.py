@@ -0,0 +1,119 @@
+import csv
+import os
+
+from journal import csv_text
+from metrics import measure
+
+
+class CustomerRepository:
+    """In-memory view of customers.csv, reloaded only when the file changes.
+
+    With a journal, new customers are written through it and the next id is
+    picked under the data folder lock, so two app instances sharing the folder
+    can't hand out the same id.
+    """
+
+    def __init__(self, path, journal=None):
+        self.path = path
+        self.journal = journal
+        self._signature = None
+        self._names_by_id = {}
+        self._ids_by_name = {}
+        self._names = []
+        self._max_id = 0
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def refresh(self):
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+
+        names_by_id = {}
+        ids_by_name = {}
+        names = []
+        max_id = 0
+        if signature is not None:
+            with measure("read customers.csv") as span, open(self.path, newline="") as file:
+                span.add(signature[1])
+                for row in csv.DictReader(file):
+                    customer_id = row["id"]
+                    name = row["name"]
+                    names_by_id[customer_id] = name
+                    # Keep the first id for a duplicated name, like the old linear scan did
+                    ids_by_name.setdefault(name, customer_id)
+                    names.append(name)
+                    try:
+                        max_id = max(max_id, int(customer_id))
+                    except ValueError:
+                        pass
+                span.add(rows=len(names))
+
+        self._names_by_id = names_by_id
+        self._ids_by_name = ids_by_name
+        self._names = names
+        self._max_id = max_id
+        self._signature = signature
+
+    def names(self):
+        self.refresh()
+        return list(self._names)
+
+    def name_for(self, customer_id, default="Unknown"):
+        self.refresh()
+        return self._names_by_id.get(customer_id, default)
+
+    def id_for(self, name):
+        self.refresh()
+        return self._ids_by_name.get(name)
+
+    def names_by_id(self):
+        self.refresh()
+        return dict(self._names_by_id)
+
+    def next_id(self):
+        self.refresh()
+        return self._max_id + 1
+
+    def add(self, name):
+        return self.add_many([name])[0]
+
+    def add_many(self, names):
+        if self.journal is None:
+            return self._add_many(names)
+        with self.journal.lock:
+            return self._add_many(names)
+
+    def _add_many(self, names):
+        if not names:
+            return []
+        if self.journal is not None:
+            self.journal.recover()  # a batch another instance died applying may hold customers and ids
+        self.refresh()
+        first_id = self._max_id + 1
+        rows = [{"id": first_id + i, "name": name} for i, name in enumerate(names)]
+        text = csv_text(["id", "name"], rows, header=self._signature is None)
+
+        if self.journal is not None:
+            self.journal.append([(self.path, text)])
+        else:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", newline="") as file:
+                file.write(text)
+
+        customer_ids = []
+        for row in rows:
+            customer_id = str(row["id"])
+            self._names_by_id[customer_id] = row["name"]
+            self._ids_by_name.setdefault(row["name"], customer_id)
+            self._names.append(row["name"])
+            customer_ids.append(customer_id)
+        self._max_id = rows[-1]["id"]
+        # Our own append shouldn't force a full reload on the next lookup
+        self._signature = self._file_signature()
+        return customer_ids
@@ -0,0 +1,78 @@
+import customtkinter as ctk
+
+# Red gradient shades for model cards
+RED_SHADES = ["#7F1D1D", "#991B1B", "#B91C1C", "#DC2626", "#EF4444", "#F87171"]
+COLUMNS = 3
+
+
+class Dashboard(ctk.CTkFrame):
+    """Home screen cards that are built once and then updated in place.
+
+    set_data() only reconfigures the labels whose text changed, and adds or
+    removes a card when a model starts or stops appearing in today's sales,
+    so a refresh never tears the frame down (no flicker, very little work).
+    """
+
+    def __init__(self, master, label_font, **kwargs):
+        kwargs.setdefault("fg_color", "transparent")
+        super().__init__(master, **kwargs)
+        self.label_font = label_font
+        self.value_font = ctk.CTkFont(size=24, weight="bold")
+        self._texts = {}
+        self._model_cards = {}
+        self.grid_columnconfigure(tuple(range(COLUMNS)), weight=1)
+
+        # Top Summary Cards
+        self.total_label = self._card(0, 0, "🛵 Bikes Sold Today", ctk.CTkFont(size=34, weight="bold"))
+        self.buyer_label = self._card(0, 1, "🧑‍💼 Recent Buyer", ctk.CTkFont(size=14), justify="center")
+        self.time_label = self._card(0, 2, "⏰ Current Time", ctk.CTkFont(size=22, weight="bold"))
+
+    def _card(self, row, column, title, value_font, color="#DC2626", **label_kwargs):
+        card = ctk.CTkFrame(self, corner_radius=12, height=160, fg_color=color)
+        card.grid(row=row, column=column, padx=10, pady=10, sticky="nsew")
+        ctk.CTkLabel(card, text=title, font=self.label_font, text_color="white").pack(pady=(15, 5))
+        value = ctk.CTkLabel(card, text="", font=value_font, text_color="white", **label_kwargs)
+        value.pack()
+        return value
+
+    def _set_text(self, label, text):
+        if self._texts.get(label) != text:
+            self._texts[label] = text
+            label.configure(text=text)
+
+    def set_time(self, text):
+        self._set_text(self.time_label, text)
+
+    def set_data(self, data):
+        recent = data["recent"]
+        self._set_text(self.total_label, str(data["total_bikes"]))
+        buyer_text = f"{recent.get('customer_name', 'N/A')}\n{recent.get('bike_model', '')}" if recent else "No Sales Yet"
+        self._set_text(self.buyer_label, buyer_text)
+        self._set_models(data["model_counts"])
+
+    def _set_models(self, model_counts):
+        models = list(model_counts)
+        if models != list(self._model_cards):
+            for model in list(self._model_cards):
+                if model not in model_counts:
+                    card, label = self._model_cards.pop(model)
+                    self._texts.pop(label, None)
+                    card.destroy()
+            for model in models:
+                if model not in self._model_cards:
+                    self._model_cards[model] = self._model_card(model)
+            # Re-lay out in today's order; only grid positions and colours change
+            self._model_cards = {model: self._model_cards[model] for model in models}
+            for i, (card, _label) in enumerate(self._model_cards.values()):
+                card.grid(row=1 + i // COLUMNS, column=i % COLUMNS, padx=10, pady=(10, 10), sticky="nsew")
+                card.configure(fg_color=RED_SHADES[i % len(RED_SHADES)])
+
+        for model, qty in model_counts.items():
+            self._set_text(self._model_cards[model][1], f"{qty} Sold")
+
+    def _model_card(self, model):
+        card = ctk.CTkFrame(self, corner_radius=12, height=160)
+        ctk.CTkLabel(card, text=model, font=self.label_font, text_color="white").pack(pady=(15, 5))
+        label = ctk.CTkLabel(card, text="", font=self.value_font, text_color="white")
+        label.pack()
+        return card, label
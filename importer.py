@@ -0,0 +1,218 @@
+import csv
+import datetime
+import os
+import sys
+import time
+from itertools import islice
+
+from catalog import BIKE_COLORS, BIKE_MODELS
+
+DEFAULT_BATCH_SIZE = 20000
+
+# Exports spell things inconsistently; match case-insensitively but store the form the app uses
+_MODELS = {model.lower(): model for model in BIKE_MODELS}
+_COLORS = {color.lower(): color for color in BIKE_COLORS}
+
+
+class Progress:
+    """Single-line progress report on stderr, redrawn at most a few times a second."""
+
+    def __init__(self, label, total_bytes, stream=sys.stderr, interval=0.5):
+        self.label = label
+        self.total_bytes = total_bytes
+        self.stream = stream
+        self.interval = interval
+        self.started = time.perf_counter()
+        self._last = 0.0
+        self.rows = 0
+
+    def update(self, rows, bytes_read, force=False):
+        self.rows = rows
+        now = time.perf_counter()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = max(now - self.started, 1e-9)
+        percent = 100.0 * bytes_read / self.total_bytes if self.total_bytes else 100.0
+        self.stream.write(f"\r{self.label}: {rows:,} rows ({percent:5.1f}%) {rows / elapsed:,.0f} rows/s")
+        self.stream.flush()
+
+    def finish(self, rows, bytes_read):
+        self.update(rows, bytes_read, force=True)
+        self.stream.write("\n")
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.rejected = 0
+        self.customers_created = 0
+
+    def __str__(self):
+        return (f"{self.rows:,} rows read, {self.imported:,} imported, {self.rejected:,} rejected, "
+                f"{self.customers_created:,} new customers")
+
+
+class RejectWriter:
+    """Writes rows that failed validation, with the reason, to <input>.rejected.csv."""
+
+    def __init__(self, source_path):
+        self.path = source_path + ".rejected.csv"
+        self._file = None
+        self._writer = None
+
+    def write(self, row, reason):
+        if self._writer is None:
+            self._file = open(self.path, "w", newline="")
+            self._writer = csv.DictWriter(self._file, fieldnames=list(row) + ["error"], extrasaction="ignore")
+            self._writer.writeheader()
+        self._writer.writerow(dict(row, error=reason))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def read_rows(path, progress):
+    """Stream the rows of a CSV export, reporting progress by bytes consumed."""
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        count = 0
+        for count, row in enumerate(csv.DictReader(file), 1):
+            yield row
+            if count % 1000 == 0:
+                progress.update(count, file.buffer.tell())
+        progress.finish(count, file.buffer.tell())
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def clean_sale(row):
+    """Normalise one export row into a sale, or raise ValueError with the reason."""
+    model = _MODELS.get((row.get("bike_model") or "").strip().lower())
+    if model is None:
+        raise ValueError(f"unknown model {row.get('bike_model')!r}")
+    color = _COLORS.get((row.get("color") or "").strip().lower())
+    if color is None:
+        raise ValueError(f"unknown colour {row.get('color')!r}")
+
+    quantity = (row.get("quantity") or "1").strip()
+    if not quantity.isdigit() or int(quantity) == 0:
+        raise ValueError(f"bad quantity {quantity!r}")
+
+    try:
+        sale_date = datetime.date.fromisoformat((row.get("sale_date") or "").strip()).isoformat()
+    except ValueError:
+        raise ValueError(f"bad date {row.get('sale_date')!r}") from None
+
+    customer_id = (row.get("customer_id") or "").strip()
+    customer_name = (row.get("customer_name") or "").strip()
+    if not customer_id and not customer_name:
+        raise ValueError("no customer_id or customer_name")
+
+    return {
+        "customer_id": customer_id,
+        "customer_name": customer_name,
+        "bike_model": model,
+        "color": color,
+        "quantity": str(int(quantity)),
+        "sale_date": sale_date,
+    }
+
+
+def validated(rows, rejects, result):
+    for row in rows:
+        result.rows += 1
+        try:
+            yield row, clean_sale(row)
+        except ValueError as error:
+            result.rejected += 1
+            rejects.write(row, str(error))
+
+
+def import_sales(storage, path, batch_size=DEFAULT_BATCH_SIZE, create_customers=False):
+    """Stream a sales export into storage.
+
+    Rows need bike_model, color, quantity, sale_date and either customer_id or
+    customer_name. Memory use is bounded by the batch size and the customer
+    table, not by the size of the file. Sales dated in a month that is
+    already closed go to that month's archive.
+    """
+    result = ImportResult()
+    rejects = RejectWriter(path)
+    progress = Progress(os.path.basename(path), os.path.getsize(path))
+
+    names_by_id = storage.customer_names_by_id()
+    ids_by_name = {}
+    for customer_id, name in names_by_id.items():
+        ids_by_name.setdefault(name, customer_id)
+    open_period = storage.open_period()
+
+    try:
+        for batch in batched(validated(read_rows(path, progress), rejects, result), batch_size):
+            if create_customers:
+                new_names = list(dict.fromkeys(
+                    sale["customer_name"] for _row, sale in batch
+                    if not sale["customer_id"] and sale["customer_name"] not in ids_by_name
+                ))
+                if new_names:
+                    for name, customer_id in zip(new_names, storage.add_customers(new_names)):
+                        ids_by_name[name] = customer_id
+                        names_by_id[customer_id] = name
+                    result.customers_created += len(new_names)
+
+            by_month = {}
+            for row, sale in batch:
+                customer_id = sale.pop("customer_id") or ids_by_name.get(sale["customer_name"])
+                name = sale.pop("customer_name")
+                if customer_id not in names_by_id:
+                    result.rejected += 1
+                    rejects.write(row, f"unknown customer {customer_id or name!r}")
+                    continue
+                sale["customer_id"] = customer_id
+                month = sale["sale_date"][:7]
+                by_month.setdefault(month if month < open_period else None, []).append(sale)
+
+            for month, sales in by_month.items():
+                if month is None:
+                    storage.add_sales(sales)
+                else:
+                    storage.add_archived_sales(month, sales)
+                result.imported += len(sales)
+    finally:
+        rejects.close()
+    return result
+
+
+def import_customers(storage, path, batch_size=DEFAULT_BATCH_SIZE):
+    """Add every name in the export's name (or customer_name) column that isn't already a customer."""
+    result = ImportResult()
+    rejects = RejectWriter(path)
+    progress = Progress(os.path.basename(path), os.path.getsize(path))
+    known = set(storage.customer_names())
+
+    try:
+        for batch in batched(read_rows(path, progress), batch_size):
+            new_names = []
+            for row in batch:
+                result.rows += 1
+                name = (row.get("name") or row.get("customer_name") or "").strip()
+                if not name:
+                    result.rejected += 1
+                    rejects.write(row, "empty name")
+                elif name not in known:
+                    known.add(name)
+                    new_names.append(name)
+            storage.add_customers(new_names)
+            result.customers_created += len(new_names)
+            result.imported += len(new_names)
+    finally:
+        rejects.close()
+    return result
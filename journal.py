@@ -0,0 +1,183 @@
+import csv
+import io
+import json
+import os
+import threading
+import time
+
+from metrics import measure
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _lock_file(file):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        return
+    file.seek(0)
+    while True:
+        try:
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:  # LK_LOCK gives up after ~10s; keep waiting
+            time.sleep(0.1)
+
+
+def _unlock_file(file):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+    else:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def csv_text(fieldnames, rows, header=False):
+    """Rows formatted exactly as csv.DictWriter would append them to a file."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+class FileLock:
+    """Exclusive lock shared by every app instance using the same data folder.
+
+    Re-entrant within a process, so a caller can hold it around a read-modify-
+    write (e.g. picking the next customer id) while the journal takes it again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            if self._depth == 0:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a+b")
+                _lock_file(self._file)
+        except BaseException:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._thread_lock.release()
+            raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            _unlock_file(self._file)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+
+class Journal:
+    """Write-ahead journal for appends to the CSV files in the data folder.
+
+    A batch of appends is first written to data/journal.log and fsynced once,
+    then applied to the target files (one fsync per file), and finally the
+    journal is truncated. Each entry records the target's size before the
+    append, so if we crash half way, recover() cuts off any torn row and
+    replays the entry. The whole sequence runs under the data folder lock.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, "journal.log")
+        self.lock = FileLock(os.path.join(data_dir, "data.lock"))
+
+    def append(self, entries, rewrite=()):
+        """Durably append text to files: entries is a list of (path, text) pairs.
+
+        Files whose path is in `rewrite` get the text as their whole new
+        content instead, in the same atomic batch as the appends.
+        """
+        entries = [(path, text) for path, text in entries if text]
+        if not entries:
+            return
+        with measure("journal append") as span, self.lock:
+            span.add(sum(len(text) for _path, text in entries), len(entries))
+            # Another instance may have died part way through applying its batch; finish that
+            # one first, or our offsets would be taken from its torn files
+            self._replay()
+            records = []
+            for path, text in entries:
+                try:
+                    offset = 0 if path in rewrite else os.path.getsize(path)
+                except FileNotFoundError:
+                    offset = 0
+                records.append({"path": os.path.basename(path), "offset": offset, "text": text})
+            self._write_records(records)
+            self._apply(records)
+            self._clear()
+
+    def recover(self):
+        """Replay entries left behind by a crash; returns how many were replayed."""
+        with self.lock:
+            return self._replay()
+
+    def _replay(self):
+        records = self._read_records()
+        if records:
+            self._apply(records)
+        self._clear()
+        return len(records)
+
+    def _write_records(self, records):
+        os.makedirs(self.data_dir, exist_ok=True)
+        with open(self.path, "w") as file:
+            for record in records:
+                file.write(json.dumps(record) + "\n")
+            file.write(json.dumps({"end": len(records)}) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _read_records(self):
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path) as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    return []  # torn journal write: the targets were never touched
+                if "end" in record:
+                    return records if record["end"] == len(records) else []
+                records.append(record)
+        return []  # no end marker, same as above
+
+    def _apply(self, records):
+        # Group by file so each target is opened and fsynced once per batch
+        by_path = {}
+        for record in records:
+            by_path.setdefault(record["path"], []).append(record)
+
+        for name, path_records in by_path.items():
+            path = os.path.join(self.data_dir, name)
+            offset = path_records[0]["offset"]
+            if os.path.exists(path) and os.path.getsize(path) > offset:
+                os.truncate(path, offset)
+            with open(path, "a", newline="") as file:
+                for record in path_records:
+                    file.write(record["text"])
+                file.flush()
+                os.fsync(file.fileno())
+
+    def _clear(self):
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            with open(self.path, "w") as file:
+                file.flush()
+                os.fsync(file.fileno())
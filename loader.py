@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundLoader:
+    """Runs data loading off the Tk thread and hands results back to it.
+
+    Tk widgets may only be touched from the mainloop thread, so workers never
+    call back into Tk: the mainloop polls the future with after() instead.
+    Starting a new load (or calling cancel) makes any pending one stale; its
+    result is dropped when it arrives.
+    """
+
+    POLL_MS = 20
+
+    def __init__(self, widget, max_workers=1):
+        self.widget = widget
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="loader")
+        self._generation = 0
+        self._future = None
+
+    def load(self, fetch, on_done, on_error=None):
+        self.cancel()
+        generation = self._generation
+        future = self._executor.submit(fetch)
+        self._future = future
+        self.widget.after(self.POLL_MS, self._poll, generation, future, on_done, on_error)
+
+    def _poll(self, generation, future, on_done, on_error):
+        if generation != self._generation:
+            return
+        if not future.done():
+            self.widget.after(self.POLL_MS, self._poll, generation, future, on_done, on_error)
+            return
+
+        self._future = None
+        error = future.exception()
+        if error is None:
+            on_done(future.result())
+        elif on_error is not None:
+            on_error(error)
+        else:
+            raise error
+
+    def cancel(self):
+        self._generation += 1
+        if self._future is not None:
+            self._future.cancel()  # only succeeds if the worker hasn't picked it up yet
+            self._future = None
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
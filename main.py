@@ -1,24 +1,59 @@
+import time
+STARTED = time.perf_counter()
+
 import customtkinter as ctk
-import tkinter as tk
 import datetime
-import time
 import os
-import csv
+import sys
+import threading
 import tkinter.messagebox as messagebox
-from CTkTable import CTkTable
+from functools import wraps
+from catalog import BIKE_COLORS, BIKE_MODELS
+from customer_picker import CustomerPicker
+from dashboard import Dashboard
+from loader import BackgroundLoader
+from metrics import METRICS, METRICS_PATH, PhaseTimer, measure, timed
+from report import prerender_month
+from search import CustomerIndex
+# storage (and NumPy behind it) and the summary table are imported when first needed
 
 # Setup theme
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+
+def reports_storage_errors(message):
+    """For button handlers that call the storage directly: a failure (server down, disk error) becomes a dialog."""
+    def decorate(handler):
+        @wraps(handler)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return handler(self, *args, **kwargs)
+            except self.storage.errors as error:
+                messagebox.showerror("Error", f"{message}\n\n{error}")
+        return wrapper
+    return decorate
+
 class BikeSalesApp(ctk.CTk):
-    def __init__(self):
+    def __init__(self, profile=None):
         super().__init__()
         self.title("Bike Sales System")
         self.state("zoomed")
         self.configure(bg="#F5F5F5")
 
-        self.reset_sales_monthly()  # Clear sales if a new month has started
+        # Show the window shell first; storage is opened and warmed up in the background
+        self.report_startup = profile is not None
+        self.profile = profile or PhaseTimer(STARTED)
+        self.profile.mark("tk root")
+        self.storage = None
+        self.watcher = None
+        self.loader = BackgroundLoader(self)
+        self.customer_index = CustomerIndex()
+        self.dashboard = None
+        self.home_date = None
+        self.views = {}  # Built on first visit, then kept and swapped in and out
+        self.current_view = None
+        self.ticks = 0
 
         # Fonts
         self.header_font = ctk.CTkFont(family="Segoe UI", size=22, weight="bold")
@@ -33,40 +68,82 @@ class BikeSalesApp(ctk.CTk):
         self.main_content = ctk.CTkFrame(self, corner_radius=15)
         self.main_content.pack(side="right", expand=True, fill="both", padx=20, pady=20)
 
-        ctk.CTkLabel(self.sidebar, text="🚲 Menu", font=self.header_font).pack(pady=(30, 20))
-
-        self.add_button("🏠 Home", self.show_home)
-        self.add_button("📈 Customer Sales", self.show_customer_sales)
-        self.add_button("➕ Add Sale", self.show_add_sale)
-        self.add_button("👤 Add Customer", self.show_add_customer)
-        self.add_button("📊 Summary", self.show_summary)
+        self.menu_label = ctk.CTkLabel(self.sidebar, text="🚲 Menu", font=self.header_font)
+        self.menu_label.pack(pady=(30, 20))
+
+        # Views need the storage, so their buttons stay disabled until it's open
+        self.nav_buttons = [
+            self.add_button("🏠 Home", self.show_home),
+            self.add_button("📈 Customer Sales", self.show_customer_sales),
+            self.add_button("➕ Add Sale", self.show_add_sale),
+            self.add_button("👤 Add Customer", self.show_add_customer),
+            self.add_button("📉 Trends", self.show_trends),
+            self.add_button("📊 Summary", self.show_summary),
+        ]
         self.add_button("❌ Exit", self.quit)
+        for btn in self.nav_buttons:
+            btn.configure(state="disabled")
+
+        self.starting_label = ctk.CTkLabel(self.main_content, text="⏳ Loading...", font=self.label_font)
+        self.starting_label.pack(pady=40)
+        self.profile.mark("window shell")
+        self.after_idle(self.profile.mark, "window shown")
+
+        self.loader.load(self.warm_up, self.on_ready, self.show_load_error)
+
+    def warm_up(self):
+        # Runs on the loader thread
+        with self.profile.phase("import storage"):
+            from storage import open_storage
+        with self.profile.phase("open storage"):
+            # BIKESALES_SERVER points this counter at another machine's `main.py serve`
+            storage = open_storage(server=os.environ.get("BIKESALES_SERVER"), token=os.environ.get("BIKESALES_TOKEN"))
+        with self.profile.phase("monthly rollover"):
+            self.reset_sales_monthly(storage)  # Clear sales if a new month has started
+        self.storage = storage
+        with self.profile.phase("home data"):
+            return self.get_home_data()
+
+    def on_ready(self, home_data):
+        self.enable_views()
+        self.show_view("home", self.build_home)
+        self.update_home(home_data)
+        self.after_idle(self.finish_startup)
+
+        # Customer pickers want the search index; build it while nobody is typing yet
+        threading.Thread(target=self.get_customer_index, name="index-warmup", daemon=True).start()
+
+    def enable_views(self):
+        # The storage is open: replace the loading message with the views, whatever Home's first load did
+        self.starting_label.destroy()
+        self.starting_label = None
+        self.watcher = self.storage.watch()  # Sales recorded by any instance show up on Home
+        for btn in self.nav_buttons:
+            btn.configure(state="normal")
+        # Hidden on purpose; bound only now, since switching views cancels the warm-up load
+        self.menu_label.bind("<Double-Button-1>", lambda event: self.show_diagnostics())
+        self.update_time()
 
-        self.show_home()
-
-    def reset_sales_monthly(self):
-        os.makedirs("data", exist_ok=True)
-        now = datetime.datetime.now()
-        current_month = now.strftime("%Y-%m")
-        flag_file = os.path.join("data", "monthly_sales.csv")
-        sales_file = os.path.join("data", "sales.csv")
-
-        # Read the last recorded month
-        if os.path.exists(flag_file):
-            with open(flag_file, "r") as f:
-                last_month = f.read().strip()
-        else:
-            last_month = ""
-
-        # If month changed, archive and reset sales file
-        if last_month != current_month:
-            if os.path.exists(sales_file):
-                archived_file = os.path.join("data", f"sales_{last_month}.csv")
-                os.rename(sales_file, archived_file)  # Move old sales to new file
-
-            with open(flag_file, "w") as f:
-                f.write(current_month)
-
+    def finish_startup(self):
+        self.profile.mark("home shown")
+        if self.report_startup:
+            if sys.stdout is not None:
+                self.profile.report(sys.stdout)
+            else:  # windowed build has no console
+                with open("startup_profile.txt", "w") as file:
+                    self.profile.report(file)
+
+    def reset_sales_monthly(self, storage=None):
+        storage = storage or self.storage
+        current_month = datetime.datetime.now().strftime("%Y-%m")
+        closing_month = storage.open_period()
+        storage.roll_over(current_month)
+        if closing_month and closing_month != current_month:
+            # Month-end report for the month just archived, without holding up startup
+            threading.Thread(target=prerender_month, args=(storage, closing_month), name="month-report",
+                             daemon=True).start()
+        # Closed months are re-sorted and checksummed in the background; nothing waits on it
+        threading.Thread(target=storage.compact, name="compact", daemon=True).start()
 
     def add_button(self, text, command):
         btn = ctk.CTkButton(
@@ -82,138 +159,144 @@ class BikeSalesApp(ctk.CTk):
             text_color="white"
         )
         btn.pack(pady=10, padx=20)
-
-    def clear_main_content(self):
-        for widget in self.main_content.winfo_children():
-            widget.destroy()
+        return btn
+
+    def show_view(self, name, build, fetch=None, bind=None):
+        """Swap in the frame for view `name`, building it on the first visit.
+
+        If given, fetch runs on the loader thread and its result is passed to
+        bind; until then the view keeps showing what it showed last time.
+        """
+        started = time.perf_counter()
+        self.loader.cancel()  # Results for the view we're leaving are no longer wanted
+        view = self.views.get(name)
+        if view is None:
+            view = self.views[name] = ctk.CTkFrame(self.main_content, fg_color="transparent")
+            with measure(f"build view {name}"):
+                build(view)
+        if view is not self.current_view:
+            if self.current_view is not None:
+                self.current_view.pack_forget()
+            view.pack(fill="both", expand=True)
+            view.tkraise()
+            self.current_view = view
+        if fetch is not None:
+            self.loader.load(timed(f"load view {name}")(fetch), bind or (lambda _data: None), self.show_load_error)
+
+        # Idle callbacks run after the redraw the swap queued, so this is the switch as the user sees it
+        self.after_idle(lambda: METRICS.record(f"switch view {name}", (time.perf_counter() - started) * 1000))
+
+    def build_error_view(self, view):
+        self.error_label = ctk.CTkLabel(view, text="", font=self.label_font)
+        self.error_label.pack(pady=40)
+
+    def show_load_error(self, error):
+        if self.storage is None:  # the data folder couldn't be opened at startup
+            self.starting_label.configure(text=f"⚠️ Could not open the data folder:\n{error}")
+            return
+        if self.starting_label is not None:  # opened, but Home's first load failed; the Home button retries it
+            self.enable_views()
+        self.show_view("error", self.build_error_view)
+        self.error_label.configure(text=f"⚠️ Could not load data:\n{error}")
 
     def get_customers(self):
-        customers_path = os.path.join("data", "customers.csv")
-        names = []
-        if os.path.exists(customers_path):
-            with open(customers_path, newline='') as file:
-                reader = csv.DictReader(file)
-                names = [row["name"] for row in reader]
-        return names
+        return self.storage.customer_names()
 
-    def show_home(self):
-        self.clear_main_content()
-        ctk.CTkLabel(self.main_content, text="📊 Dashboard", font=self.header_font).pack(pady=(30, 5))
+    def get_customer_index(self):
+        # Only names added since the last call are indexed
+        self.customer_index.sync(self.get_customers())
+        return self.customer_index
 
-        card_container = ctk.CTkFrame(self.main_content, fg_color="transparent")
-        card_container.pack(pady=(10, 10), padx=20, fill="both", expand=True)
-        card_container.grid_columnconfigure((0, 1, 2), weight=1)
+    def show_home(self):
+        self.show_view("home", self.build_home, self.get_home_data, self.update_home)
 
+    def get_home_data(self):
         today_str = datetime.date.today().strftime("%Y-%m-%d")
-        sales_today = self.get_sales_for_date(today_str)
-
-        total_bikes = 0
-        model_counts = {}
-        recent = sales_today[-1] if sales_today else None
-
-        for sale in sales_today:
-            model = sale["bike_model"]
-            qty = int(sale.get("quantity", 1))
-            total_bikes += qty
-            model_counts[model] = model_counts.get(model, 0) + qty
-
-        # Top Summary Cards
-        card1 = ctk.CTkFrame(card_container, corner_radius=12, height=160, fg_color="#DC2626")
-        card1.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
-        ctk.CTkLabel(card1, text="🛵 Bikes Sold Today", font=self.label_font, text_color="white").pack(pady=(15, 5))
-        ctk.CTkLabel(card1, text=str(total_bikes), font=ctk.CTkFont(size=34, weight="bold"), text_color="white").pack()
-
-        card2 = ctk.CTkFrame(card_container, corner_radius=12, height=160, fg_color="#DC2626")
-        card2.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
-        ctk.CTkLabel(card2, text="🧑‍💼 Recent Buyer", font=self.label_font, text_color="white").pack(pady=(15, 5))
-        buyer_text = f"{recent.get('customer_name', 'N/A')}\n{recent.get('bike_model', '')}" if recent else "No Sales Yet"
-        ctk.CTkLabel(card2, text=buyer_text, font=ctk.CTkFont(size=14), text_color="white", justify="center").pack()
-
-        card3 = ctk.CTkFrame(card_container, corner_radius=12, height=160, fg_color="#DC2626")
-        card3.grid(row=0, column=2, padx=10, pady=10, sticky="nsew")
-        ctk.CTkLabel(card3, text="⏰ Current Time", font=self.label_font, text_color="white").pack(pady=(15, 5))
-        self.time_label = ctk.CTkLabel(card3, text="", font=ctk.CTkFont(size=22, weight="bold"), text_color="white")
-        self.time_label.pack()
-        self.update_time()
+        model_counts = self.storage.model_totals_for_date(today_str)
+        return {
+            "date": today_str,
+            "model_counts": model_counts,
+            "total_bikes": sum(model_counts.values()),
+            "recent": self.get_recent_sale(today_str),
+        }
 
-        # Red gradient shades for model cards
-        red_shades = ["#7F1D1D", "#991B1B", "#B91C1C", "#DC2626", "#EF4444", "#F87171"]
+    def build_home(self, view):
+        ctk.CTkLabel(view, text="📊 Dashboard", font=self.header_font).pack(pady=(30, 5))
 
-        # Model-specific cards
-        if model_counts:
-            row = 1
-            col = 0
-            for i, (model, qty) in enumerate(model_counts.items()):
-                color = red_shades[i % len(red_shades)]
-                card = ctk.CTkFrame(card_container, corner_radius=12, height=160, fg_color=color)
-                card.grid(row=row, column=col, padx=10, pady=(10, 10), sticky="nsew")
-                ctk.CTkLabel(card, text=model, font=self.label_font, text_color="white").pack(pady=(15, 5))
-                ctk.CTkLabel(card, text=f"{qty} Sold", font=ctk.CTkFont(size=24, weight="bold"), text_color="white").pack()
+        self.dashboard = Dashboard(view, self.label_font)
+        self.dashboard.pack(pady=(10, 10), padx=20, fill="both", expand=True)
+        self.dashboard.set_time(time.strftime("%I:%M:%S %p"))
 
-                col += 1
-                if col > 2:
-                    row += 1
-                    col = 0
+    def home_visible(self):
+        return self.current_view is not None and self.current_view is self.views.get("home")
 
+    def refresh_home(self):
+        self.loader.load(self.get_home_data, self.update_home, self.show_load_error)
+
+    def update_home(self, data):
+        if self.home_visible():
+            self.home_date = data["date"]
+            self.dashboard.set_data(data)
 
     def update_time(self):
-        if hasattr(self, "time_label") and self.time_label.winfo_exists():
-            current_time = time.strftime("%I:%M:%S %p")
-            self.time_label.configure(text=f"{current_time}")
-            self.after(1000, self.update_time)
-
-    def get_sales_for_date(self, date_str):
-        sales = []
-        sales_path = os.path.join("data", "sales.csv")
-        if os.path.exists(sales_path):
-            with open(sales_path, newline='') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row["sale_date"] == date_str:
-                        row["customer_name"] = self.get_customer_name(row["customer_id"])
-                        sales.append(row)
-        return sales
+        # One tick a second keeps the clock going and picks up new sales from the watcher
+        changed = self.watcher.changed()
+        if self.home_visible():
+            self.dashboard.set_time(time.strftime("%I:%M:%S %p"))
+            today = datetime.date.today().strftime("%Y-%m-%d")
+            if changed or self.home_date not in (None, today):
+                self.refresh_home()
+
+        self.ticks += 1
+        if METRICS.enabled and self.ticks % 60 == 0:
+            self.export_metrics()
+        self.after(1000, self.update_time)
+
+    def export_metrics(self):
+        try:
+            METRICS.export()
+        except OSError:
+            pass  # metrics are best effort; never get in the way of a sale
+
+    def get_recent_sale(self, date_str):
+        sale = self.storage.last_sale_for_date(date_str)
+        if sale is None:
+            return None
+        return dict(sale, customer_name=self.get_customer_name(sale["customer_id"]))
 
     def get_customer_name(self, customer_id):
-        customers_path = os.path.join("data", "customers.csv")
-        if os.path.exists(customers_path):
-            with open(customers_path, newline='') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row["id"] == customer_id:
-                        return row["name"]
-        return "Unknown"
+        return self.storage.customer_name(customer_id)
 
     def show_add_sale(self):
-        self.clear_main_content()
+        self.show_view("add_sale", self.build_add_sale, self.get_customer_index)
+        self.reset_add_sale()
 
-        form_frame = ctk.CTkFrame(self.main_content, fg_color="transparent")
+    def build_add_sale(self, view):
+        form_frame = ctk.CTkFrame(view, fg_color="transparent")
         form_frame.pack(pady=30, padx=40, fill="both", expand=True)
 
         ctk.CTkLabel(form_frame, text="➕ Add New Sale", font=self.header_font, text_color="white").pack(pady=(10, 20))
 
-        names = self.get_customers()
         self.form_entries = {}
 
         # Customer name
         customer_label = ctk.CTkLabel(form_frame, text="Customer Name:", font=self.label_font, text_color="white")
         customer_label.pack(pady=5)
-        customer_combo = ctk.CTkComboBox(form_frame, width=300, values=names)
-        customer_combo.pack(pady=5)
-        self.form_entries["Customer Name"] = customer_combo
+        customer_picker = CustomerPicker(form_frame, self.customer_index, width=300)
+        customer_picker.pack(pady=5)
+        self.form_entries["Customer Name"] = customer_picker
 
         # Sale date
         date_label = ctk.CTkLabel(form_frame, text="Sale Date:", font=self.label_font, text_color="white")
         date_label.pack(pady=5)
         sale_date = ctk.CTkEntry(form_frame, width=300)
-        sale_date.insert(0, datetime.date.today().strftime("%Y-%m-%d"))
         sale_date.pack(pady=5)
         self.form_entries["Sale Date"] = sale_date
 
         # Section for multiple bikes
         self.bike_entries = []
-        bike_models = ["CD 70", "CG 125", "CD 70 Dream", "Pridor", "CG 125S", "CG 125S GOLD"]
-        bike_colors = ["Red", "Black", "Blue", "Silver"]
+        bike_models = BIKE_MODELS
+        bike_colors = BIKE_COLORS
 
         self.bikes_container = ctk.CTkFrame(form_frame, fg_color="transparent")
         self.bikes_container.pack(pady=10)
@@ -229,8 +312,9 @@ class BikeSalesApp(ctk.CTk):
             qty = ctk.CTkEntry(row, width=80, placeholder_text="Qty")
             qty.pack(side="left", padx=5)
 
-            self.bike_entries.append({"model": model, "color": color, "qty": qty})
+            self.bike_entries.append({"row": row, "model": model, "color": color, "qty": qty})
 
+        self.add_bike_row = add_bike_row
         add_bike_row()  # Add the first row
 
         ctk.CTkButton(form_frame, text="➕ Add Another Bike", command=add_bike_row, fg_color="#DC2626", hover_color="#B91C1C").pack(pady=10)
@@ -247,6 +331,21 @@ class BikeSalesApp(ctk.CTk):
         )
         submit_btn.pack(pady=(20, 10))
 
+    def reset_add_sale(self):
+        # Start every visit with an empty form, as if it had just been built
+        self.form_entries["Customer Name"].set("")
+        sale_date = self.form_entries["Sale Date"]
+        sale_date.delete(0, "end")
+        sale_date.insert(0, datetime.date.today().strftime("%Y-%m-%d"))
+        for entry in self.bike_entries[1:]:
+            entry["row"].destroy()
+        del self.bike_entries[1:]
+        first = self.bike_entries[0]
+        first["model"].set(BIKE_MODELS[0])
+        first["color"].set(BIKE_COLORS[0])
+        first["qty"].delete(0, "end")
+
+    @reports_storage_errors("The sale could not be confirmed as recorded. Check Home before entering it again.")
     def submit_sale(self):
         customer_name = self.form_entries["Customer Name"].get()
         sale_date = self.form_entries["Sale Date"].get().strip()
@@ -256,53 +355,41 @@ class BikeSalesApp(ctk.CTk):
             return
 
         # Find customer ID
-        customers_path = os.path.join("data", "customers.csv")
-        customer_id = None
-        if os.path.exists(customers_path):
-            with open(customers_path, newline='') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row["name"] == customer_name:
-                        customer_id = row["id"]
-                        break
+        customer_id = self.get_customer_id(customer_name)
 
         if not customer_id:
             messagebox.showerror("Error", "Customer not found.")
             return
 
         # Prepare sales data
-        sales_path = os.path.join("data", "sales.csv")
-        file_exists = os.path.isfile(sales_path)
-        os.makedirs("data", exist_ok=True)
-
-        with open(sales_path, "a", newline="") as file:
-            writer = csv.DictWriter(file, fieldnames=["customer_id", "bike_model", "color", "quantity", "sale_date"])
-            if not file_exists:
-                writer.writeheader()
-
-            for entry in self.bike_entries:
-                model = entry["model"].get()
-                color = entry["color"].get()
-                qty = entry["qty"].get()
-
-                if not model or not color or not qty.isdigit():
-                    continue
-
-                writer.writerow({
-                    "customer_id": customer_id,
-                    "bike_model": model,
-                    "color": color,
-                    "quantity": qty,
-                    "sale_date": sale_date
-                })
+        rows = []
+        for entry in self.bike_entries:
+            model = entry["model"].get()
+            color = entry["color"].get()
+            qty = entry["qty"].get()
+
+            if not model or not color or not qty.isdigit():
+                continue
+
+            rows.append({
+                "customer_id": customer_id,
+                "bike_model": model,
+                "color": color,
+                "quantity": qty,
+                "sale_date": sale_date
+            })
+
+        self.storage.add_sales(rows)
 
         messagebox.showinfo("Success", "✅ Sale recorded successfully!")
         self.show_home()
 
     def show_add_customer(self):
-        self.clear_main_content()
+        self.show_view("add_customer", self.build_add_customer)
+        self.customer_name_entry.delete(0, "end")
 
-        frame = ctk.CTkFrame(self.main_content, fg_color="transparent")
+    def build_add_customer(self, view):
+        frame = ctk.CTkFrame(view, fg_color="transparent")
         frame.pack(pady=50, padx=50, fill="both", expand=True)
 
         ctk.CTkLabel(frame, text="➕ Add New Customer", font=self.header_font, text_color="white").pack(pady=(10, 30))
@@ -322,46 +409,45 @@ class BikeSalesApp(ctk.CTk):
         )
         submit_btn.pack(pady=20)
 
+    @reports_storage_errors("The customer could not be confirmed as saved. Search for them before adding them again.")
     def save_new_customer(self):
         name = self.customer_name_entry.get().strip()
         if not name:
             messagebox.showwarning("Input Error", "Customer name cannot be empty.")
             return
 
-        os.makedirs("data", exist_ok=True)
-        customers_path = os.path.join("data", "customers.csv")
-        file_exists = os.path.exists(customers_path)
-        new_id = 1
-
-        if file_exists:
-            with open(customers_path, newline="") as file:
-                reader = csv.DictReader(file)
-                rows = list(reader)
-                if rows:
-                    last = rows[-1]
-                    new_id = int(last["id"]) + 1
-
-        with open(customers_path, "a", newline="") as file:
-            writer = csv.DictWriter(file, fieldnames=["id", "name"])
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow({"id": new_id, "name": name})
+        index = self.get_customer_index()
+        if index.exists(name):
+            messagebox.showwarning("Duplicate Customer", f"Customer '{name}' already exists.")
+            return
+
+        # Catch "Khawaja Motor" when "Khawaja Motors" already exists
+        similar = index.similar(name)
+        if similar:
+            listing = "\n".join(f"• {match}" for match in similar)
+            if not messagebox.askyesno("Possible Duplicate",
+                                       f"Similar customers already exist:\n{listing}\n\nSave '{name}' anyway?"):
+                return
+
+        self.storage.add_customer(name)
+        self.customer_index.sync(self.get_customers())
 
         messagebox.showinfo("Success", f"Customer '{name}' added successfully.")
         self.show_add_sale()  # Refresh dropdown
         
     def show_customer_sales(self):
-        self.clear_main_content()
+        self.show_view("customer_sales", self.build_customer_sales, self.get_customer_index)
+        self.sales_result_label.configure(text="")
 
-        ctk.CTkLabel(self.main_content, text="📈 Customer Sales Summary", font=self.header_font).pack(pady=20)
+    def build_customer_sales(self, view):
+        ctk.CTkLabel(view, text="📈 Customer Sales Summary", font=self.header_font).pack(pady=20)
 
-        # Dropdown for customer names
-        names = self.get_customers()
-        self.selected_customer = ctk.CTkComboBox(self.main_content, values=names, width=300)
+        # Search-as-you-type customer picker
+        self.selected_customer = CustomerPicker(view, self.customer_index, width=300)
         self.selected_customer.pack(pady=10)
 
         # Duration Buttons (Today, Last 7 Days, This Month)
-        btn_frame = ctk.CTkFrame(self.main_content, fg_color="transparent")
+        btn_frame = ctk.CTkFrame(view, fg_color="transparent")
         btn_frame.pack(pady=10)
 
         ctk.CTkButton(btn_frame, text="Today", command=self.count_today, width=100, fg_color="#DC2626",
@@ -372,67 +458,53 @@ class BikeSalesApp(ctk.CTk):
             hover_color="#B91C1C", corner_radius=20).grid(row=0, column=2, padx=5)
 
         # Manual Date Entry
-        self.date_entry = ctk.CTkEntry(self.main_content, width=300, placeholder_text="Enter date (YYYY-MM-DD)")
+        self.date_entry = ctk.CTkEntry(view, width=300, placeholder_text="Enter date (YYYY-MM-DD)")
         self.date_entry.pack(pady=(20, 5))
 
-        ctk.CTkButton(self.main_content, text="Check This Date",fg_color="#DC2626",
+        ctk.CTkButton(view, text="Check This Date",fg_color="#DC2626",
             hover_color="#B91C1C", corner_radius=20, command=self.count_on_date).pack()
 
-        self.sales_result_label = ctk.CTkLabel(self.main_content, text="", font=self.label_font)
+        self.sales_result_label = ctk.CTkLabel(view, text="", font=self.label_font)
         self.sales_result_label.pack(pady=10)
 
     def get_customer_id(self, name):
-        customers_path = os.path.join("data", "customers.csv")
-        if os.path.exists(customers_path):
-            with open(customers_path, newline='') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row["name"] == name:
-                        return row["id"]
-        return None
-
-    def count_sales(self, customer_id, condition):
-        total_quantity = 0
-        sales_path = os.path.join("data", "sales.csv")
-        if os.path.exists(sales_path):
-            with open(sales_path, newline="") as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row["customer_id"] == customer_id and condition(row["sale_date"]):
-                        try:
-                            qty = int(row.get("quantity", 1))
-                        except ValueError:
-                            qty = 1
-                        total_quantity += qty
-        return total_quantity
+        return self.storage.customer_id(name)
+
+    def count_sales(self, customer_id, start, end):
+        return self.storage.customer_total(customer_id, start, end)
 
 
     def show_sales_result(self, count):
         name = self.selected_customer.get()
         self.sales_result_label.configure(text=f"🛵 {name} bought {count} bike(s) in this period.")
 
+    @reports_storage_errors("Could not load this customer's sales.")
     def count_today(self):
         name = self.selected_customer.get()
         customer_id = self.get_customer_id(name)
         today = datetime.date.today().strftime("%Y-%m-%d")
-        count = self.count_sales(customer_id, lambda d: d == today)
+        count = self.count_sales(customer_id, today, today)
         self.show_sales_result(count)
 
+    @reports_storage_errors("Could not load this customer's sales.")
     def count_last_7_days(self):
         name = self.selected_customer.get()
         customer_id = self.get_customer_id(name)
         today = datetime.date.today()
-        last_7 = [(today - datetime.timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
-        count = self.count_sales(customer_id, lambda d: d in last_7)
+        start = (today - datetime.timedelta(days=6)).strftime("%Y-%m-%d")
+        count = self.count_sales(customer_id, start, today.strftime("%Y-%m-%d"))
         self.show_sales_result(count)
 
+    @reports_storage_errors("Could not load this customer's sales.")
     def count_this_month(self):
         name = self.selected_customer.get()
         customer_id = self.get_customer_id(name)
-        month_prefix = datetime.date.today().strftime("%Y-%m")
-        count = self.count_sales(customer_id, lambda d: d.startswith(month_prefix))
+        today = datetime.date.today()
+        month_end = (today.replace(day=1) + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+        count = self.count_sales(customer_id, today.replace(day=1).isoformat(), month_end.isoformat())
         self.show_sales_result(count)
 
+    @reports_storage_errors("Could not load this customer's sales.")
     def count_on_date(self):
         name = self.selected_customer.get()
         customer_id = self.get_customer_id(name)
@@ -440,7 +512,7 @@ class BikeSalesApp(ctk.CTk):
         if not date:
             messagebox.showwarning("Missing Date", "Please enter a date.")
             return
-        count = self.count_sales(customer_id, lambda d: d == date)
+        count = self.count_sales(customer_id, date, date)
         self.show_sales_result(count)
 
         
@@ -452,85 +524,227 @@ class BikeSalesApp(ctk.CTk):
     #     self.clear_main_content()
     #     ctk.CTkLabel(self.main_content, text="All Sales Records", font=self.header_font).pack(pady=20)
 
-    def show_summary(self):
-        self.clear_main_content()
-        ctk.CTkLabel(self.main_content, text="📊 Customer Summary", font=self.header_font).pack(pady=(20, 10))
-
-        customers_path = os.path.join("data", "customers.csv")
-        sales_path = os.path.join("data", "sales.csv")
+    def show_trends(self):
+        self.show_view("trends", self.build_trends, self.get_trends_cube, self.update_trends)
 
-        bike_models = ["CD 70", "CG 125", "CD 70 Dream", "Pridor", "CG 125S", "CG 125S GOLD"]
-        summary_data = {}
-        grand_totals = {model: 0 for model in bike_models}
-        grand_total_all = 0
+    def get_trends_cube(self, customer_id=None):
+        from cube import SalesCube
 
-        if os.path.exists(customers_path) and os.path.exists(sales_path):
-            with open(customers_path, newline='') as c_file:
-                customers = {row["id"]: row["name"] for row in csv.DictReader(c_file)}
+        # Every archived month plus the open one; charts and totals are then answered from the cube alone
+        cells = self.storage.daily_cells(datetime.date.min.isoformat(), datetime.date.max.isoformat(), customer_id)
+        return customer_id, SalesCube.from_cells(cells)
 
-            with open(sales_path, newline='') as s_file:
-                for row in csv.DictReader(s_file):
-                    cid = row["customer_id"]
-                    name = customers.get(cid, "Unknown")
-                    model = row["bike_model"]
-                    quantity = int(row.get("quantity", 1))
+    def build_trends(self, view):
+        from chart import TrendChart
 
-                    if name not in summary_data:
-                        summary_data[name] = {"total": 0, "models": {m: 0 for m in bike_models}}
-                    summary_data[name]["total"] += quantity
-                    summary_data[name]["models"][model] += quantity
+        self.trends_cube = None
+        self.trends_customer = None
+        self.trends_customer_name = None
+        ctk.CTkLabel(view, text="📉 Sales Trends", font=self.header_font).pack(pady=(20, 10))
 
-                    grand_totals[model] += quantity
-                    grand_total_all += quantity
+        controls = ctk.CTkFrame(view, fg_color="transparent")
+        controls.pack(pady=5)
+        today = datetime.date.today()
+        self.trends_from = ctk.CTkEntry(controls, width=120, placeholder_text="From YYYY-MM-DD")
+        self.trends_from.insert(0, (today - datetime.timedelta(days=89)).isoformat())
+        self.trends_from.grid(row=0, column=0, padx=5)
+        self.trends_to = ctk.CTkEntry(controls, width=120, placeholder_text="To YYYY-MM-DD")
+        self.trends_to.insert(0, today.isoformat())
+        self.trends_to.grid(row=0, column=1, padx=5)
+        self.trends_step = ctk.CTkSegmentedButton(controls, values=["Auto", "Day", "Week", "Month"],
+                                                  command=lambda _value: self.draw_trends())
+        self.trends_step.set("Auto")
+        self.trends_step.grid(row=0, column=2, padx=5)
+        self.trends_by = ctk.CTkSegmentedButton(controls, values=["Model", "Colour"],
+                                                command=lambda _value: self.draw_trends())
+        self.trends_by.set("Model")
+        self.trends_by.grid(row=0, column=3, padx=5)
+
+        ranges = ctk.CTkFrame(view, fg_color="transparent")
+        ranges.pack(pady=5)
+        for column, (text, days) in enumerate([("30 Days", 30), ("90 Days", 90), ("1 Year", 365), ("All", None)]):
+            btn = ctk.CTkButton(ranges, text=text, command=lambda days=days: self.set_trends_range(days), width=90,
+                                fg_color="#DC2626", hover_color="#B91C1C", corner_radius=20)
+            btn.grid(row=0, column=column, padx=5, sticky="n")
+        self.trends_picker = CustomerPicker(ranges, self.customer_index, width=220)
+        self.trends_picker.grid(row=0, column=4, padx=(15, 5), sticky="n")
+        ctk.CTkButton(ranges, text="Apply", command=self.apply_trends, width=90, fg_color="#DC2626",
+                      hover_color="#B91C1C", corner_radius=20).grid(row=0, column=5, padx=5, sticky="n")
+
+        self.trends_status = ctk.CTkLabel(view, text="⏳ Loading...", font=self.small_font)
+        self.trends_status.pack()
+        self.trends_chart = TrendChart(view)
+        self.trends_chart.pack(fill="both", expand=True, padx=20, pady=(10, 20))
+
+    def update_trends(self, result, name=None):
+        self.trends_customer, self.trends_cube = result
+        self.trends_customer_name = name
+        self.draw_trends()
+
+    def set_trends_range(self, days):
+        if self.trends_cube is None:
+            return
+        end = datetime.date.today().isoformat()
+        if days is None:
+            start = self.trends_cube.first_date if self.trends_cube else end
+        else:
+            start = (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+        for entry, value in ((self.trends_from, start), (self.trends_to, end)):
+            entry.delete(0, "end")
+            entry.insert(0, value)
+        self.draw_trends()
+
+    @reports_storage_errors("Could not look up this customer.")
+    def apply_trends(self):
+        name = self.trends_picker.get().strip()
+        customer_id = self.get_customer_id(name) if name else None
+        if name and customer_id is None:
+            messagebox.showwarning("Unknown Customer", f"No customer named '{name}'.")
+            return
+        if customer_id != self.trends_customer:
+            # Another slice of the cube: fetched in the background, the chart keeps the old one until then
+            self.trends_status.configure(text="⏳ Loading...")
+            self.loader.load(lambda: self.get_trends_cube(customer_id),
+                             lambda result: self.update_trends(result, name or None), self.show_load_error)
+        else:
+            self.draw_trends()
 
-        # Build table header
-        table_values = [["Customer Name", "Total Bikes"] + bike_models]
+    def draw_trends(self):
+        from cube import auto_step
 
-        for name, info in summary_data.items():
-            row = [name, str(info["total"])] + [str(info["models"][model]) for model in bike_models]
-            table_values.append(row)
+        cube = self.trends_cube
+        if cube is None:
+            return
+        try:
+            start = datetime.date.fromisoformat(self.trends_from.get().strip()).isoformat()
+            end = datetime.date.fromisoformat(self.trends_to.get().strip()).isoformat()
+        except ValueError:
+            self.trends_status.configure(text="⚠️ Dates must be YYYY-MM-DD")
+            return
+        if start > end:
+            self.trends_status.configure(text="⚠️ 'From' is after 'To'")
+            return
 
-        # Add grand total row
-        total_row = ["Grand Total: ", str(grand_total_all)] + [""] * len(bike_models)
-        table_values.append(total_row)
+        step = self.trends_step.get().lower()
+        if step == "auto":
+            step = auto_step(start, end)
+        by = "model" if self.trends_by.get() == "Model" else "color"
+        labels, series = cube.series(start, end, step, by)
+        self.trends_chart.set_series(labels, series)
 
-        # Frame for table with scrollbars
-        table_frame = ctk.CTkFrame(self.main_content)
-        table_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        who = self.trends_customer_name or "all customers"
+        self.trends_status.configure(text=f"🛵 {cube.total(start, end)} bike(s) sold to {who} from {start} to {end}"
+                                          f" · one point per {step}")
 
-        canvas = tk.Canvas(table_frame, bg="#2b2b2b", highlightthickness=0)
-        canvas.pack(side="left", fill="both", expand=True)
+    def show_summary(self):
+        self.show_view("summary", self.build_summary, self.get_summary_values, self.update_summary)
 
-        # Add vertical and horizontal scrollbars
-        v_scrollbar = ctk.CTkScrollbar(table_frame, orientation="vertical", command=canvas.yview)
-        v_scrollbar.pack(side="right", fill="y")
+    def get_summary_values(self):
+        from summary import summary_values
 
-        h_scrollbar = ctk.CTkScrollbar(self.main_content, orientation="horizontal", command=canvas.xview)
-        h_scrollbar.pack(fill="x")
+        return summary_values(self.storage)
 
-        canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+    def build_summary(self, view):
+        from virtual_table import VirtualTable
 
-        table_container = ctk.CTkFrame(canvas)
-        canvas.create_window((0, 0), window=table_container, anchor="nw")
+        ctk.CTkLabel(view, text="📊 Customer Summary", font=self.header_font).pack(pady=(20, 10))
 
-        # Use larger font for better readability
-        table = CTkTable(
-            master=table_container,
-            values=table_values,
-            corner_radius=10,
+        # Only the rows on screen get widgets, so this stays fast with thousands of customers
+        self.summary_table = VirtualTable(
+            view,
+            columns=["Customer Name", "Total Bikes"] + BIKE_MODELS,
+            rows=[],
+            footer=["⏳ Loading...", ""] + [""] * len(BIKE_MODELS),
             header_color="#DC2626",
             colors=["#1E1E1E", "#2A2A2A"],
             font=("Segoe UI", 16)
         )
-        table.pack()
+        self.summary_table.pack(fill="both", expand=True, padx=20, pady=20)
+
+    def update_summary(self, table_data):
+        _columns, rows, total_row = table_data
+        self.summary_table.set_rows(rows, total_row)
+
+    def show_diagnostics(self):
+        # Not on the sidebar: double-click the Menu title to get here
+        self.show_view("diagnostics", self.build_diagnostics, self.get_diagnostics_rows, self.update_diagnostics)
+
+    def get_diagnostics_rows(self):
+        rows = []
+        for name, stat in METRICS.snapshot().items():
+            rows.append([name, stat["count"], stat["mean_ms"], stat["p95_ms"], round(stat["max_ms"], 1),
+                         round(stat["total_ms"], 1), round(stat["bytes"] / 1024, 1), stat["rows"]])
+        return rows
+
+    def build_diagnostics(self, view):
+        from virtual_table import VirtualTable
+
+        ctk.CTkLabel(view, text="🩺 Diagnostics", font=self.header_font).pack(pady=(20, 10))
+
+        controls = ctk.CTkFrame(view, fg_color="transparent")
+        controls.pack(pady=5)
+        self.metrics_switch = ctk.CTkSwitch(controls, text="Record metrics", command=self.toggle_metrics,
+                                            font=self.small_font)
+        self.metrics_switch.grid(row=0, column=0, padx=10)
+        buttons = [("Refresh", self.show_diagnostics), ("Export", self.export_diagnostics),
+                   ("Reset", self.reset_diagnostics)]
+        for column, (text, command) in enumerate(buttons, 1):
+            ctk.CTkButton(controls, text=text, command=command, width=100, fg_color="#DC2626",
+                          hover_color="#B91C1C", corner_radius=20).grid(row=0, column=column, padx=5)
+
+        self.diagnostics_status = ctk.CTkLabel(view, text="", font=self.small_font)
+        self.diagnostics_status.pack()
+
+        self.diagnostics_table = VirtualTable(
+            view,
+            columns=["Operation", "Count", "Mean ms", "p95 ms", "Max ms", "Total ms", "KB read", "Rows"],
+            rows=[],
+            header_color="#DC2626",
+            colors=["#1E1E1E", "#2A2A2A"],
+            font=("Segoe UI", 13),
+            column_width=150
+        )
+        self.diagnostics_table.pack(fill="both", expand=True, padx=20, pady=20)
+
+    def update_diagnostics(self, rows):
+        if METRICS.enabled:
+            self.metrics_switch.select()
+        else:
+            self.metrics_switch.deselect()
+        self.diagnostics_table.set_rows(rows)
+        state = "on, exported every minute to" if METRICS.enabled else "off; exports go to"
+        self.diagnostics_status.configure(text=f"Recording is {state} {os.path.abspath(METRICS_PATH)}")
 
-        def update_scroll_region(event=None):
-            canvas.configure(scrollregion=canvas.bbox("all"))
+    def toggle_metrics(self):
+        METRICS.enabled = bool(self.metrics_switch.get())
+        self.show_diagnostics()
 
-        table_container.bind("<Configure>", update_scroll_region)
+    def export_diagnostics(self):
+        self.export_metrics()
+        self.show_diagnostics()
 
+    def reset_diagnostics(self):
+        METRICS.reset()
+        self.show_diagnostics()
 
 
 if __name__ == "__main__":
-    app = BikeSalesApp()
+    args = sys.argv[1:]
+    profile_startup = "--profile-startup" in args
+    if profile_startup:
+        args.remove("--profile-startup")
+    if args[:1] == ["--server"] and len(args) >= 2:
+        # python main.py --server http://counter-1:8765 runs the app against that server
+        os.environ["BIKESALES_SERVER"] = args[1]
+        del args[:2]
+    if args:
+        # Command line tools: python main.py migrate | import ... | report ...
+        from cli import main as cli_main
+        sys.exit(cli_main(args))
+    profile = None
+    if profile_startup:
+        # Per-phase timings are printed once Home is on screen
+        profile = PhaseTimer(STARTED)
+        profile.mark("imports")
+    app = BikeSalesApp(profile)
     app.mainloop()
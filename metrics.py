@@ -0,0 +1,201 @@
+import bisect
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of numbers (0.5 is the median)."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+# Upper bounds (ms) of the wall-time histogram buckets; the last one catches everything slower
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf")]
+
+METRICS_PATH = os.path.join("logs", "metrics.log")
+MAX_FILE_BYTES = 1024 * 1024
+BACKUPS = 3
+
+
+class Stat:
+    __slots__ = ("count", "total_ms", "max_ms", "bytes", "rows", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bytes = 0
+        self.rows = 0
+        self.histogram = [0] * len(BUCKETS_MS)
+
+    def add(self, ms, bytes_read, rows):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.bytes += bytes_read
+        self.rows += rows
+        self.histogram[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def quantile_ms(self, fraction):
+        """Upper bound of the histogram bucket holding the given quantile."""
+        wanted = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.histogram):
+            seen += count
+            if seen >= wanted:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p95_ms": round(self.quantile_ms(0.95), 3),
+            "max_ms": round(self.max_ms, 3),
+            "bytes": self.bytes,
+            "rows": self.rows,
+            "histogram": self.histogram,
+        }
+
+
+class _Span:
+    __slots__ = ("bytes", "rows")
+
+    def __init__(self):
+        self.bytes = 0
+        self.rows = 0
+
+    def add(self, bytes_read=0, rows=0):
+        self.bytes += bytes_read
+        self.rows += rows
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def add(self, bytes_read=0, rows=0):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Registry:
+    """Counts, bytes read, rows parsed and wall-time histograms per operation name.
+
+    Off unless BIKESALES_METRICS is set or it's switched on from the
+    diagnostics view; while off, timed() and measure() cost one attribute
+    check. With BIKESALES_METRICS=print every sample also goes to stderr.
+    """
+
+    def __init__(self, enabled=False, echo=False):
+        self.enabled = enabled
+        self.echo = echo
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, ms, bytes_read=0, rows=0):
+        if not self.enabled:
+            return
+        with self._lock:
+            stat = self._stats.get(name)
+            if stat is None:
+                stat = self._stats[name] = Stat()
+            stat.add(ms, bytes_read, rows)
+        if self.echo and sys.stderr is not None:
+            sys.stderr.write(f"{name}: {ms:.1f} ms\n")
+
+    @contextmanager
+    def measure(self, name):
+        """Time the block; call .add(bytes_read=, rows=) on the yielded span to count data."""
+        if not self.enabled:
+            yield _NULL_SPAN
+            return
+        span = _Span()
+        started = time.perf_counter()
+        try:
+            yield span
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000, span.bytes, span.rows)
+
+    def timed(self, name=None):
+        """Decorator form of measure(); the name defaults to the function's qualified name."""
+        def decorate(func):
+            label = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(label, (time.perf_counter() - started) * 1000)
+            return wrapper
+        return decorate
+
+    def snapshot(self):
+        with self._lock:
+            return {name: stat.as_dict() for name, stat in sorted(self._stats.items())}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def export(self, path=METRICS_PATH):
+        """Append a timestamped snapshot as one JSON line, rotating the file past MAX_FILE_BYTES."""
+        line = json.dumps({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "pid": os.getpid(),
+                           "metrics": self.snapshot()})
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) + len(line) > MAX_FILE_BYTES:
+            for i in range(BACKUPS - 1, 0, -1):
+                if os.path.exists(f"{path}.{i}"):
+                    os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+            os.replace(path, f"{path}.1")
+        with open(path, "a") as file:
+            file.write(line + "\n")
+
+
+_setting = os.environ.get("BIKESALES_METRICS", "")
+METRICS = Registry(enabled=bool(_setting), echo=_setting == "print")
+timed = METRICS.timed
+measure = METRICS.measure
+
+
+class PhaseTimer:
+    """Wall-clock timings of the named phases of a sequence such as startup.
+
+    Phases may run on different threads; the report lists them in the order
+    they finished, with how long each took and when it ended.
+    """
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, start, time.perf_counter()))
+
+    def mark(self, name):
+        """Record a point in time as a phase that started with the sequence."""
+        self.phases.append((name, self.started, time.perf_counter()))
+
+    def report(self, stream=None):
+        stream = stream or sys.stderr
+        for name, start, end in sorted(self.phases, key=lambda phase: phase[2]):
+            stream.write(f"{name:<24}{(end - start) * 1000:9.1f} ms   (at {(end - self.started) * 1000:.1f} ms)\n")
+        stream.flush()
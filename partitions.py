@@ -0,0 +1,274 @@
+import glob
+import json
+import os
+import re
+from collections import defaultdict
+
+from aggregate import (SalesFrame, customer_mask, customer_model_totals, customer_total, daily_cells, date_to_day,
+                       day_to_date, model_totals)
+from metrics import measure
+from snapshot import load_snapshot, write_snapshot
+
+ARCHIVE_PATTERN = re.compile(r"^sales_(\d{4}-\d{2})\.csv$")
+SUMMARY_VERSION = 3
+
+
+class PartitionSummary:
+    """Totals for one closed month, stored next to it as sales_YYYY-MM.summary.json.
+
+    Holds the per (customer_id, bike_model) totals plus the actual date span of
+    the rows, which is what pruning uses: a sales file can hold dates from
+    outside its own month if a sale was back-dated. Months that a query only
+    partly covers are filtered on their columnar snapshot instead. Rows whose
+    sale date can't be parsed fall in no date range, so they are left out of
+    the totals and the span, the same as a scan of the snapshot leaves them out.
+    """
+
+    def __init__(self, by_customer_model, rows, source, min_date, max_date):
+        self.by_customer_model = by_customer_model
+        self.rows = rows
+        self.source = source
+        self.min_date = min_date
+        self.max_date = max_date
+
+        self.by_customer = defaultdict(int)
+        for (customer_id, _model), qty in by_customer_model.items():
+            self.by_customer[customer_id] += qty
+
+    def covers(self, start, end):
+        return self.min_date is not None and start <= self.min_date and self.max_date <= end
+
+    @classmethod
+    def from_frame(cls, frame, source):
+        dated = frame.day > 0
+        if not dated.any():
+            return cls({}, len(frame), source, None, None)
+        days = frame.day[dated]
+        return cls(customer_model_totals(frame, dated), len(frame), source,
+                   day_to_date(int(days.min())), day_to_date(int(days.max())))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            data = json.load(file)
+        if data.get("version") != SUMMARY_VERSION:
+            return None
+        by_customer_model = {(customer_id, model): qty for customer_id, model, qty in data["by_customer_model"]}
+        return cls(by_customer_model, data["rows"], tuple(data["source"]), data["min_date"], data["max_date"])
+
+    def save(self, path):
+        data = {
+            "version": SUMMARY_VERSION,
+            "source": list(self.source),
+            "rows": self.rows,
+            "min_date": self.min_date,
+            "max_date": self.max_date,
+            "by_customer_model": [list(key) + [qty] for key, qty in sorted(self.by_customer_model.items())],
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as file:
+            file.write(json.dumps(data, separators=(",", ":")))
+        os.replace(tmp_path, path)
+
+
+class PartitionIndex:
+    """Answers date-range queries over the archived sales_YYYY-MM.csv files.
+
+    Each closed month is summarised once into a sidecar file, and the date span
+    of every month is kept in sales_index.json. A query uses the spans to skip
+    months outside the range without opening them, and months entirely inside
+    the range use their precomputed totals. Sidecars and spans are rebuilt if
+    their CSV has changed since they were written.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.index_path = os.path.join(data_dir, "sales_index.json")
+        self._summaries = {}
+        self._frames = {}
+        self._cells = {}
+        self._spans = None
+
+    def csv_path(self, month):
+        return os.path.join(self.data_dir, f"sales_{month}.csv")
+
+    def summary_path(self, month):
+        return os.path.join(self.data_dir, f"sales_{month}.summary.json")
+
+    def snapshot_path(self, month):
+        return os.path.join(self.data_dir, f"sales_{month}.cols")
+
+    def checksum_path(self, month):
+        return os.path.join(self.data_dir, f"sales_{month}.checksum.json")
+
+    def months(self):
+        months = []
+        for path in glob.glob(os.path.join(self.data_dir, "sales_*.csv")):
+            match = ARCHIVE_PATTERN.match(os.path.basename(path))
+            if match:
+                months.append(match.group(1))
+        return sorted(months)
+
+    def _source_signature(self, month):
+        try:
+            stat = os.stat(self.csv_path(month))
+        except FileNotFoundError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def summary(self, month):
+        source = self._source_signature(month)
+        if source is None:
+            self._summaries.pop(month, None)
+            return None
+
+        cached = self._summaries.get(month)
+        if cached is not None and cached.source == source:
+            return cached
+
+        summary = None
+        summary_path = self.summary_path(month)
+        if os.path.exists(summary_path):
+            try:
+                with measure("load partition summary") as span:
+                    summary = PartitionSummary.load(summary_path)
+                    span.add(os.path.getsize(summary_path), summary.rows if summary is not None else 0)
+            except (OSError, ValueError, KeyError, IndexError):
+                summary = None
+        if summary is None or summary.source != source:
+            summary = self.build(month)
+        else:
+            self._summaries[month] = summary
+            self._record_span(month, summary)
+        return summary
+
+    def build(self, month):
+        # Parse the CSV once into the snapshot, then summarise from its columns
+        source = self._source_signature(month)
+        self._frames.pop(month, None)
+        with measure("build partition") as span:
+            write_snapshot(self.csv_path(month), self.snapshot_path(month), source)
+            summary = PartitionSummary.from_frame(self.frame(month), source)
+            summary.save(self.summary_path(month))
+            span.add(source[0] if source else 0, summary.rows)
+        self._summaries[month] = summary
+        self._record_span(month, summary)
+        return summary
+
+    def release(self, month):
+        """Forget a month's cached summary and unmap its snapshot, so its files can be replaced."""
+        self._summaries.pop(month, None)
+        self._frames.pop(month, None)
+
+    def snapshot(self, month):
+        """Memory-mapped columnar copy of a closed month (see snapshot.py)."""
+        return load_snapshot(self.csv_path(month), self.snapshot_path(month))
+
+    def _load_spans(self):
+        if self._spans is None:
+            try:
+                with open(self.index_path) as file:
+                    self._spans = json.load(file)
+            except (OSError, ValueError):
+                self._spans = {}
+        return self._spans
+
+    def _record_span(self, month, summary):
+        spans = self._load_spans()
+        entry = {"version": SUMMARY_VERSION, "source": list(summary.source), "min_date": summary.min_date,
+                 "max_date": summary.max_date}
+        if spans.get(month) == entry:
+            return
+        spans[month] = entry
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(spans, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def span(self, month):
+        """(min_date, max_date) of a closed month, or None if it has no sales."""
+        source = self._source_signature(month)
+        if source is None:
+            return None
+        entry = self._load_spans().get(month)
+        if entry is None or entry.get("version") != SUMMARY_VERSION or tuple(entry["source"]) != source:
+            summary = self.summary(month)
+            return (summary.min_date, summary.max_date) if summary.min_date else None
+        return (entry["min_date"], entry["max_date"]) if entry["min_date"] else None
+
+    def prune(self, start, end):
+        """Closed months that can hold sales between start and end."""
+        if not date_to_day(start) or not date_to_day(end):
+            return []  # not a date range; the summaries' string comparisons would still match something
+        selected = []
+        for month in self.months():
+            span = self.span(month)
+            if span is not None and span[0] <= end and start <= span[1]:
+                selected.append(month)
+        return selected
+
+    def frame(self, month):
+        """SalesFrame over a closed month's snapshot, kept mapped between queries."""
+        source = self._source_signature(month)
+        cached = self._frames.pop(month, None)
+        if cached is None or cached[0] != source:
+            # Drop the old mapping before the snapshot file may be rewritten
+            cached = None
+            cached = (source, SalesFrame.from_snapshot(self.snapshot(month)))
+        self._frames[month] = cached
+        return cached[1]
+
+    def customer_total(self, customer_id, start, end):
+        total = 0
+        for month in self.prune(start, end):
+            summary = self.summary(month)
+            if summary.covers(start, end):
+                total += summary.by_customer.get(customer_id, 0)
+            else:
+                total += customer_total(self.frame(month), customer_id, start, end)
+        return total
+
+    def model_totals_for_date(self, date):
+        totals = defaultdict(int)
+        for month in self.prune(date, date):
+            frame = self.frame(month)
+            for model, qty in model_totals(frame, frame.range_mask(date, date)).items():
+                totals[model] += qty
+        return dict(totals)
+
+    def customer_model_totals(self, start, end):
+        totals = defaultdict(int)
+        for month in self.prune(start, end):
+            summary = self.summary(month)
+            if summary.covers(start, end):
+                partial = summary.by_customer_model
+            else:
+                frame = self.frame(month)
+                partial = customer_model_totals(frame, frame.range_mask(start, end))
+            for key, qty in partial.items():
+                totals[key] += qty
+        return dict(totals)
+
+    def daily_cells(self, start, end, customer_id=None):
+        """{(date, bike_model, color): qty} between start and end, optionally for one customer."""
+        cells = defaultdict(int)
+        for month in self.prune(start, end):
+            if customer_id is None and self.summary(month).covers(start, end):
+                partial = self._month_cells(month)
+            else:
+                frame = self.frame(month)
+                mask = frame.range_mask(start, end)
+                if customer_id is not None:
+                    mask &= customer_mask(frame, customer_id)
+                partial = daily_cells(frame, mask)
+            for key, qty in partial.items():
+                cells[key] += qty
+        return dict(cells)
+
+    def _month_cells(self, month):
+        # Whole-month cells are what trend charts over long ranges are made of, so keep them
+        source = self._source_signature(month)
+        cached = self._cells.get(month)
+        if cached is None or cached[0] != source:
+            cached = self._cells[month] = (source, daily_cells(self.frame(month)))
+        return cached[1]
@@ -0,0 +1,212 @@
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from aggregate import SalesFrame
+from server import IDLE_TIMEOUT
+from storage import Storage
+
+# A keep-alive connection the server has already closed fails on first use; a read is retried once
+RETRY_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+# Connections idle this long are replaced before use, as the server may be closing them right now
+RECONNECT_AFTER = IDLE_TIMEOUT - 5
+CONNECT_TIMEOUT = 5  # a server that is down should fail a click quickly, whatever the read timeout
+
+
+class RemoteError(Exception):
+    pass
+
+
+def _unpairs(pairs):
+    return {tuple(entry[:-1]): entry[-1] for entry in pairs}
+
+
+class RemoteStorage(Storage):
+    """Storage served by another machine's `python main.py serve`.
+
+    Each thread keeps its own keep-alive connection to the server, so the Tk
+    thread and the background loader don't wait on each other's requests.
+    """
+
+    errors = (OSError, http.client.HTTPException, RemoteError)
+
+    def __init__(self, url, token=None, timeout=30, connect_timeout=CONNECT_TIMEOUT):
+        parts = urlsplit(url if "://" in url else f"http://{url}")
+        self.url = f"{parts.scheme}://{parts.netloc}"
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.token = token
+        self.timeout = timeout
+        self.connect_timeout = min(connect_timeout, timeout)
+        self.data_dir = None  # nothing local; see watch()
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and time.monotonic() - self._local.used > RECONNECT_AFTER:
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.connect_timeout)
+            conn.connect()
+            conn.sock.settimeout(self.timeout)
+            self._local.conn = conn
+            self._local.used = time.monotonic()
+        return conn
+
+    def _request(self, method, name, args=None):
+        path = f"/api/{name}"
+        body = None
+        headers = {}
+        if self.token:
+            headers["X-Bikesales-Token"] = self.token
+        if method == "GET" and args:
+            path += "?" + urlencode(args)
+        elif method == "POST":
+            body = json.dumps(args or {})
+            headers["Content-Type"] = "application/json"
+
+        # A write is never retried: the server may have applied it before the connection dropped
+        attempts = (1, 2) if method == "GET" else (2,)
+        for attempt in attempts:
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                payload = response.read()
+                self._local.used = time.monotonic()
+                break
+            except RETRY_ERRORS:
+                conn.close()
+                self._local.conn = None
+                if attempt == 2:
+                    raise
+            except OSError:
+                conn.close()
+                self._local.conn = None
+                raise
+
+        data = json.loads(payload)
+        if response.status != 200:
+            raise RemoteError(f"{self.url}{path}: {data.get('error', response.status)}")
+        return data["result"]
+
+    def _get(self, method, /, **args):
+        return self._request("GET", method, args)
+
+    def _post(self, method, /, **args):
+        return self._request("POST", method, args)
+
+    def watch(self):
+        return RemoteWatcher(self)
+
+    # Customers
+    def customer_names(self):
+        return self._get("customer_names")
+
+    def customer_names_by_id(self):
+        return self._get("customer_names_by_id")
+
+    def customer_name(self, customer_id, default="Unknown"):
+        return self._get("customer_name", customer_id=customer_id, default=default)
+
+    def customer_id(self, name):
+        return self._get("customer_id", name=name)
+
+    def add_customer(self, name):
+        return self._post("add_customer", name=name)
+
+    def add_customers(self, names):
+        return self._post("add_customers", names=list(names))
+
+    # Sales in the open period
+    def add_sales(self, rows):
+        self._post("add_sales", rows=list(rows))
+
+    def model_totals_for_date(self, date):
+        return self._get("model_totals_for_date", date=date)
+
+    def last_sale_for_date(self, date):
+        return self._get("last_sale_for_date", date=date)
+
+    def customer_total(self, customer_id, start, end):
+        return self._get("customer_total", customer_id=customer_id, start=start, end=end)
+
+    def customer_model_totals(self):
+        return _unpairs(self._get("customer_model_totals"))
+
+    def sales_frame(self):
+        return SalesFrame.from_buckets(_unpairs(self._get("sales_buckets")))
+
+    # Sales history
+    def sales_totals(self, start, end):
+        return _unpairs(self._get("sales_totals", start=start, end=end))
+
+    def daily_cells(self, start, end, customer_id=None):
+        args = {"start": start, "end": end}
+        if customer_id is not None:
+            args["customer_id"] = customer_id
+        return _unpairs(self._get("daily_cells", **args))
+
+    # Period archive
+    def open_period(self):
+        return self._get("open_period")
+
+    def add_archived_sales(self, month, rows):
+        self._post("add_archived_sales", month=month, rows=list(rows))
+
+    def roll_over(self, current_month):
+        self._post("roll_over", current_month=current_month)
+
+    def archived_months(self):
+        return self._get("archived_months")
+
+    def iter_archived_sales(self, month):
+        return iter(self._get("archived_sales", month=month))
+
+
+class RemoteWatcher:
+    """changed() for a RemoteStorage: whether anything was written on the server since the last call.
+
+    A daemon thread polls /api/version; changed() only reads what it found,
+    so the Tk tick never waits on the network, even with the server down.
+    """
+
+    POLL_SECONDS = 1
+
+    def __init__(self, storage):
+        # Own short-timeout client, used by the polling thread only
+        self.storage = RemoteStorage(storage.url, storage.token, timeout=self.POLL_SECONDS)
+        self._lock = threading.Lock()
+        self._changed = False
+        self._stop = threading.Event()
+        self._version = None
+        self._thread = threading.Thread(target=self._poll, name="remote-watcher", daemon=True)
+        self._thread.start()
+
+    def _fetch(self):
+        try:
+            return self.storage._get("version")
+        except (OSError, RemoteError, ValueError):
+            return None  # server unreachable: report no change and try again next time
+
+    def _poll(self):
+        self._version = self._fetch()  # the baseline; fetched here so creating a watcher never blocks
+        while not self._stop.wait(self.POLL_SECONDS):
+            version = self._fetch()
+            if version is None:
+                continue
+            if self._version is not None and version != self._version:
+                with self._lock:
+                    self._changed = True
+            self._version = version
+
+    def changed(self):
+        with self._lock:
+            changed, self._changed = self._changed, False
+        return changed
+
+    def close(self):
+        self._stop.set()
@@ -0,0 +1,138 @@
+import csv
+import datetime
+import json
+import os
+import sys
+
+from catalog import BIKE_MODELS
+from metrics import timed
+
+FORMATS = ["csv", "xlsx", "json"]
+REPORTS_DIR = "reports"
+
+
+def month_ranges(start, end):
+    """(month, first_day, last_day) for every month start..end touches, clipped to the range."""
+    day = datetime.date.fromisoformat(start)
+    last = datetime.date.fromisoformat(end)
+    while day <= last:
+        next_month = (day.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+        month_end = min(next_month - datetime.timedelta(days=1), last)
+        yield day.strftime("%Y-%m"), day.isoformat(), month_end.isoformat()
+        day = next_month
+
+
+class Report:
+    """Bikes per customer and model between two dates (inclusive), without any UI.
+
+    Iterating rows() streams the table: with by_month there is one block of
+    rows per month and only that month's totals are in memory at a time.
+    Models that aren't in the catalogue any more are counted under "Other".
+    The grand total row is complete once rows() has been exhausted.
+    """
+
+    def __init__(self, storage, start, end, by_month=False, models=BIKE_MODELS):
+        self.storage = storage
+        self.start = start
+        self.end = end
+        self.by_month = by_month
+        self.models = list(models)
+        self._model_totals = [0] * (len(self.models) + 1)
+
+    @property
+    def columns(self):
+        prefix = ["Month"] if self.by_month else []
+        return prefix + ["Customer ID", "Customer Name", "Total Bikes"] + self.models + ["Other"]
+
+    @property
+    def total_row(self):
+        prefix = [""] if self.by_month else []
+        return prefix + ["", "Grand Total", sum(self._model_totals)] + self._model_totals
+
+    def rows(self):
+        self._model_totals = [0] * (len(self.models) + 1)
+        names = self.storage.customer_names_by_id()
+        if self.by_month:
+            for month, start, end in month_ranges(self.start, self.end):
+                for row in self._rows(self.storage.sales_totals(start, end), names):
+                    yield [month] + row
+        else:
+            yield from self._rows(self.storage.sales_totals(self.start, self.end), names)
+
+    def _rows(self, totals, names):
+        column = {model: i for i, model in enumerate(self.models)}
+        other = len(self.models)
+        by_customer = {}
+        for (customer_id, model), qty in totals.items():
+            counts = by_customer.get(customer_id)
+            if counts is None:
+                counts = by_customer[customer_id] = [0] * (other + 1)
+            counts[column.get(model, other)] += qty
+
+        def sort_key(customer_id):
+            return names.get(customer_id, "Unknown").lower(), customer_id
+
+        for customer_id in sorted(by_customer, key=sort_key):
+            counts = by_customer[customer_id]
+            for i, qty in enumerate(counts):
+                self._model_totals[i] += qty
+            yield [customer_id, names.get(customer_id, "Unknown"), sum(counts)] + counts
+
+
+def write_csv(report, file):
+    writer = csv.writer(file)
+    writer.writerow(report.columns)
+    writer.writerows(report.rows())
+    writer.writerow(report.total_row)
+
+
+def write_json(report, file):
+    # Written a row at a time so a year of dealers never has to sit in one string
+    file.write(json.dumps({"from": report.start, "to": report.end, "columns": report.columns})[:-1])
+    file.write(', "rows": [')
+    for i, row in enumerate(report.rows()):
+        file.write(("," if i else "") + "\n  " + json.dumps(row))
+    file.write("\n], " + json.dumps({"total": report.total_row})[1:] + "\n")
+
+
+def write_xlsx(report, path):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise RuntimeError("The xlsx format needs openpyxl: pip install openpyxl") from None
+
+    workbook = Workbook(write_only=True)  # streams rows to disk instead of building the sheet in memory
+    sheet = workbook.create_sheet(f"{report.start} to {report.end}"[:31])
+    sheet.append(report.columns)
+    for row in report.rows():
+        sheet.append(row)
+    sheet.append(report.total_row)
+    workbook.save(path)
+
+
+@timed("report")
+def write_report(report, fmt, output=None):
+    """Write the report as csv, json or xlsx to the output path, or stdout (csv and json only)."""
+    if fmt == "xlsx":
+        if output is None:
+            raise ValueError("xlsx reports need an output file")
+        write_xlsx(report, output)
+    elif output is None:
+        (write_json if fmt == "json" else write_csv)(report, sys.stdout)
+    else:
+        with open(output, "w", newline="", encoding="utf-8") as file:
+            (write_json if fmt == "json" else write_csv)(report, file)
+
+
+def prerender_month(storage, month, reports_dir=REPORTS_DIR):
+    """Write reports/sales_report_YYYY-MM.csv for a closed month; returns its path."""
+    first = datetime.date.fromisoformat(f"{month}-01")
+    last = (first + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+    start, end = first.isoformat(), last.isoformat()
+
+    os.makedirs(reports_dir, exist_ok=True)
+    path = os.path.join(reports_dir, f"sales_report_{month}.csv")
+    tmp_path = path + ".tmp"
+    write_report(Report(storage, start, end), "csv", tmp_path)
+    os.replace(tmp_path, path)
+    return path
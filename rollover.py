@@ -0,0 +1,217 @@
+import csv
+import hashlib
+import json
+import os
+import re
+
+from aggregate import SalesFrame
+from journal import csv_text
+from metrics import measure
+from partitions import PartitionIndex, PartitionSummary
+from rollup import SALES_FIELDS
+from snapshot import Snapshot, write_snapshot
+
+MONTH_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+ORPHAN_NAME = "sales_.csv"  # where older versions archived the open month when the flag file was blank
+
+
+def valid_month(text):
+    return text if MONTH_PATTERN.match(text or "") else ""
+
+
+def read_flag(path):
+    """The open month recorded in monthly_sales.csv, or "" if it is missing, blank or garbled."""
+    try:
+        with open(path) as file:
+            return valid_month(file.read().strip())
+    except FileNotFoundError:
+        return ""
+
+
+def read_sales(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="") as file:
+        return [{field: row.get(field) or "" for field in SALES_FIELDS} for row in csv.DictReader(file)]
+
+
+def _is_empty(path):
+    try:
+        return os.path.getsize(path) == 0
+    except FileNotFoundError:
+        return True
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def split_by_month(rows, current_month):
+    """({month: rows} for the sales dated before current_month, rows that stay in the open period).
+
+    Rows dated in the open month or later, or whose date can't be read, are
+    kept rather than guessed into an archive.
+    """
+    closed = {}
+    kept = []
+    for row in rows:
+        month = valid_month(row["sale_date"][:7])
+        if month and month < current_month:
+            closed.setdefault(month, []).append(row)
+        else:
+            kept.append(row)
+    return closed, kept
+
+
+def roll_over(journal, history, sales_path, flag_path, current_month):
+    """Close every month before current_month; returns the months that received sales.
+
+    Sales go to the archive of the month they are dated in, however many
+    months were skipped and whatever the flag file says. A sales_.csv left by
+    older versions is split the same way even when there is no month to
+    close. Everything runs under the data folder lock, and the archive
+    appends, the new sales.csv and flag are one journal batch: a crash part
+    way is replayed to completion on the next start, and a second run
+    changes nothing.
+    """
+    with journal.lock:
+        orphan_path = os.path.join(os.path.dirname(sales_path), ORPHAN_NAME)
+        last_month = read_flag(flag_path)
+        closing = not last_month or last_month < current_month
+        if not closing and not os.path.exists(orphan_path):
+            return []
+
+        orphan_rows = read_sales(orphan_path)
+        open_rows = read_sales(sales_path) if closing else []
+        closed, kept = split_by_month(orphan_rows + open_rows, current_month)
+
+        entries = []
+        rewrite = set()
+        for month in sorted(closed):
+            path = history.csv_path(month)
+            entries.append((path, csv_text(SALES_FIELDS, closed[month], header=_is_empty(path))))
+        if closing:
+            if orphan_rows or open_rows:  # sales.csv cut down to the open month
+                entries.append((sales_path, csv_text(SALES_FIELDS, kept, header=True)))
+                rewrite.add(sales_path)
+            entries.append((flag_path, current_month))
+            rewrite.add(flag_path)
+        else:  # the month is already open: the orphan's open-month sales join it
+            entries.append((sales_path, csv_text(SALES_FIELDS, kept, header=_is_empty(sales_path))))
+        if os.path.exists(orphan_path):
+            entries.append((orphan_path, csv_text(SALES_FIELDS, [], header=True)))  # emptied now, removed below
+            rewrite.add(orphan_path)
+        journal.append(entries, rewrite)
+
+        if os.path.exists(orphan_path):
+            os.remove(orphan_path)
+        return sorted(closed)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_checksum(history, month):
+    try:
+        with open(history.checksum_path(month)) as file:
+            entry = json.load(file)
+        return entry if {"sha256", "source"} <= entry.keys() else None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def write_checksum(history, month, sha256, rows):
+    path = history.checksum_path(month)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump({"sha256": sha256, "rows": rows, "source": _signature(history.csv_path(month))}, file)
+    os.replace(tmp_path, path)
+
+
+def compact_month(history, month, lock, swap=None):
+    """Rewrite a closed month sorted by date with a checksum; False if it was appended to meanwhile.
+
+    The sorted file and its snapshot and summary are all built next to the
+    originals without any lock. os.replace keeps size and mtime, so they are
+    already stamped with the source signature the new CSV will have. Only
+    the renames happen under the lock, and only if the original is still
+    unchanged. swap(month, install), if given, runs install() under the
+    caller's own lock.
+    """
+    path = history.csv_path(month)
+    source = _signature(path)
+    rows = read_sales(path)
+    rows.sort(key=lambda row: row["sale_date"])
+
+    staged = {path: path + ".compact", history.snapshot_path(month): history.snapshot_path(month) + ".compact",
+              history.summary_path(month): history.summary_path(month) + ".compact"}
+    with open(staged[path], "w", newline="") as file:
+        file.write(csv_text(SALES_FIELDS, rows, header=True))
+        file.flush()
+        os.fsync(file.fileno())
+    sha256 = file_sha256(staged[path])
+    new_source = tuple(_signature(staged[path]))
+    write_snapshot(staged[path], staged[history.snapshot_path(month)], new_source)
+    snapshot = Snapshot(staged[history.snapshot_path(month)])
+    try:
+        summary = PartitionSummary.from_frame(SalesFrame.from_snapshot(snapshot), new_source)
+    finally:
+        snapshot.close()
+    summary.save(staged[history.summary_path(month)])
+
+    def install():
+        with lock:
+            if _signature(path) != source:
+                for staged_path in staged.values():
+                    os.remove(staged_path)
+                return False
+            # The CSV goes last: until it is in place the old snapshot and summary still match the old CSV
+            for target in (history.snapshot_path(month), history.summary_path(month), path):
+                os.replace(staged[target], target)
+            write_checksum(history, month, sha256, len(rows))
+            return True
+
+    return swap(month, install) if swap is not None else install()
+
+
+def compact(data_dir, lock, swap=None, months=None):
+    """Compact the closed months that changed since their last compaction; returns those done.
+
+    For a background thread; see compact_month() for swap.
+    """
+    history = PartitionIndex(data_dir)
+    done = []
+    for month in months or history.months():
+        entry = read_checksum(history, month)
+        if entry is not None and entry["source"] == _signature(history.csv_path(month)):
+            continue
+        with measure("compact partition") as span:
+            span.add(os.path.getsize(history.csv_path(month)), 0)
+            if compact_month(history, month, lock, swap):
+                done.append(month)
+            # else appended to while we worked; the next run picks it up
+    return done
+
+
+def verify(data_dir):
+    """(month, status) for every closed month: "ok", "corrupt", "changed" since compaction, or "unchecked"."""
+    history = PartitionIndex(data_dir)
+    for month in history.months():
+        entry = read_checksum(history, month)
+        if entry is None:
+            yield month, "unchecked"
+        elif entry["source"][0] != os.path.getsize(history.csv_path(month)):
+            yield month, "changed"
+        elif file_sha256(history.csv_path(month)) != entry["sha256"]:
+            yield month, "corrupt"
+        else:
+            yield month, "ok"
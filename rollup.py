@@ -0,0 +1,129 @@
+import os
+from collections import defaultdict
+
+from aggregate import SalesFrame, customer_model_totals, customer_total, model_totals
+from journal import csv_text
+from tail import TailReader
+
+SALES_FIELDS = ["customer_id", "bike_model", "color", "quantity", "sale_date"]
+
+
+def parse_quantity(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 1
+
+
+class SalesRollup:
+    """Quantity totals for sales.csv keyed by (date, customer_id, bike_model, color).
+
+    Built once from the CSV, kept current by append(), and rebuilt only when the
+    file is changed by something else (another instance, the monthly rollover).
+    Rows appended by someone else are picked up by tailing the file, so a
+    refresh costs O(new rows); only truncation, rotation or an in-place edit
+    forces a full rescan.
+
+    Queries run on a SalesFrame of the buckets. New rows are appended to the
+    frame as a small delta rather than rebuilding it. With a journal, appends
+    go through it as one atomic, fsynced batch.
+    """
+
+    def __init__(self, path, journal=None):
+        self.path = path
+        self.journal = journal
+        self._tail = TailReader(path)
+        self._signature = None
+        self._reset()
+
+    def _reset(self):
+        self.buckets = defaultdict(int)
+        self._last_sale = {}
+        self._frame = None
+        self._delta = defaultdict(int)
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _add_row(self, row):
+        date = row["sale_date"]
+        customer_id = row["customer_id"]
+        model = row["bike_model"]
+        qty = parse_quantity(row.get("quantity", 1))
+
+        key = (date, customer_id, model, row["color"])
+        self.buckets[key] += qty
+        self._last_sale[date] = {"customer_id": customer_id, "bike_model": model}
+        if self._frame is not None:
+            self._delta[key] += qty
+
+    def refresh(self):
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+
+        reset, rows = self._tail.read_new()
+        if reset:
+            self._reset()
+        for row in rows:
+            self._add_row(row)
+        self._signature = signature
+
+    def append(self, rows):
+        if self.journal is None:
+            return self._append(rows)
+        with self.journal.lock:
+            return self._append(rows)
+
+    def _append(self, rows):
+        if not rows:
+            return
+        if self.journal is not None:
+            self.journal.recover()  # finish another instance's torn batch before we tail past it
+        self.refresh()
+        text = csv_text(SALES_FIELDS, rows, header=self._signature is None)
+
+        if self.journal is not None:
+            self.journal.append([(self.path, text)])
+        else:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", newline="") as file:
+                file.write(text)
+
+        for row in rows:
+            self._add_row(row)
+        self._tail.skip_to_end(len(rows))
+        self._signature = self._file_signature()
+
+    def frame(self):
+        self.refresh()
+        if self._frame is None or len(self._frame) > 2 * len(self.buckets):
+            # (Re)build from the buckets; also compacts a frame grown by many deltas
+            self._frame = SalesFrame.from_buckets(self.buckets)
+            self._delta.clear()
+        elif self._delta:
+            self._frame = SalesFrame.concat([self._frame, SalesFrame.from_buckets(self._delta)])
+            self._delta.clear()
+        return self._frame
+
+    def model_totals_for_date(self, date):
+        frame = self.frame()
+        return model_totals(frame, frame.range_mask(date, date))
+
+    def last_sale_for_date(self, date):
+        self.refresh()
+        return self._last_sale.get(date)
+
+    def customer_total(self, customer_id, start, end):
+        return customer_total(self.frame(), customer_id, start, end)
+
+    def customer_model_totals(self):
+        return customer_model_totals(self.frame())
+
+    def customer_model_totals_between(self, start, end):
+        frame = self.frame()
+        return customer_model_totals(frame, frame.range_mask(start, end))
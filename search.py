@@ -0,0 +1,136 @@
+import heapq
+import re
+import threading
+from collections import Counter
+
+TOP_N = 20  # ids kept on each trie node; searches never ask for more
+MAX_CANDIDATES = 500  # fuzzy matching scores the names sharing the most trigrams, at most this many
+MAX_DEPTH = 16  # longer prefixes are checked against the names at this depth
+
+
+def normalize(name):
+    return re.sub(r"\s+", " ", name).strip().lower()
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Node:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {}
+        self.ids = []
+
+
+class CustomerIndex:
+    """Search-as-you-type index over customer names.
+
+    A prefix trie answers "starts with" queries on the whole name and on each
+    word in it; every trie node keeps the first TOP_N names below it, so a
+    prefix lookup is O(len(query)) no matter how many customers there are.
+    A trigram index backs it up with fuzzy matches for typos and near-
+    duplicates. Names can be added one at a time as customers are saved.
+    """
+
+    def __init__(self, names=()):
+        self._lock = threading.RLock()
+        self._root = _Node()
+        self._trigrams = {}
+        self.names = []
+        self._grams = []
+        self._exact = {}
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name):
+        with self._lock:
+            key = normalize(name)
+            if not key:
+                return
+            name_id = len(self.names)
+            self.names.append(name)
+            self._exact.setdefault(key, name_id)
+
+            # Index the full name and every word start, so "mot" finds "Khawaja Motors"
+            starts = [0] + [m.end() for m in re.finditer(" ", key)]
+            for start in starts:
+                node = self._root
+                for char in key[start:start + MAX_DEPTH]:
+                    child = node.children.get(char)
+                    if child is None:
+                        child = node.children[char] = _Node()
+                    node = child
+                    if len(node.ids) < TOP_N and name_id not in node.ids:
+                        node.ids.append(name_id)
+
+            grams = frozenset(trigrams(key))
+            self._grams.append(grams)
+            for gram in grams:
+                self._trigrams.setdefault(gram, []).append(name_id)
+
+    def sync(self, names):
+        """Add names appended to the customer list since the index was built."""
+        with self._lock:
+            for name in names[len(self.names):]:
+                self.add(name)
+
+    def _prefix_ids(self, key):
+        node = self._root
+        for char in key[:MAX_DEPTH]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        if len(key) <= MAX_DEPTH:
+            return node.ids
+        return [name_id for name_id in node.ids if self._matches_prefix(name_id, key)]
+
+    def _matches_prefix(self, name_id, key):
+        name = normalize(self.names[name_id])
+        return name.startswith(key) or f" {key}" in name
+
+    def _fuzzy(self, key, limit, exclude=()):
+        grams = trigrams(key)
+        # Score only the names sharing the most trigrams with the query, wherever they are
+        # in the posting lists; Counter does the counting in C
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._trigrams.get(gram, ()))
+        for name_id in exclude:
+            shared.pop(name_id, None)
+        candidates = [name_id for name_id, _count in shared.most_common(MAX_CANDIDATES)]
+
+        # Dice coefficient over trigram sets: 1.0 means the same trigrams
+        scored = []
+        for name_id in candidates:
+            name_grams = self._grams[name_id]
+            scored.append((2 * len(grams & name_grams) / (len(grams) + len(name_grams)), name_id))
+        return heapq.nsmallest(limit, scored, key=lambda item: (-item[0], item[1]))
+
+    def search(self, query, limit=10):
+        """Up to `limit` names: prefix matches first, then the closest fuzzy matches."""
+        key = normalize(query)
+        if not key:
+            return []
+        with self._lock:
+            ids = list(self._prefix_ids(key)[:limit])
+            if len(ids) < limit and len(key) >= 3:
+                ids += [name_id for _score, name_id in self._fuzzy(key, limit - len(ids), set(ids))]
+            return [self.names[name_id] for name_id in ids]
+
+    def similar(self, name, threshold=0.75, limit=5):
+        """Existing names that look like `name`, most similar first (exact matches included)."""
+        key = normalize(name)
+        if not key:
+            return []
+        with self._lock:
+            return [self.names[name_id] for score, name_id in self._fuzzy(key, limit) if score >= threshold]
+
+    def exists(self, name):
+        with self._lock:
+            return normalize(name) in self._exact
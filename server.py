@@ -0,0 +1,206 @@
+import asyncio
+import datetime
+import hmac
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+from metrics import measure
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+IDLE_TIMEOUT = 60  # seconds a keep-alive connection may sit unused
+MAX_BODY = 64 * 1024 * 1024
+ROLLOVER_CHECK = 60  # seconds between monthly rollover checks
+
+# Storage methods served over GET (cached until the next write) and POST (writes)
+READS = {
+    "customer_names", "customer_names_by_id", "customer_name", "customer_id",
+    "model_totals_for_date", "last_sale_for_date", "customer_total", "customer_model_totals",
+    "sales_buckets", "sales_totals", "daily_cells", "open_period", "archived_months", "archived_sales", "version",
+}
+WRITES = {"add_customer", "add_customers", "add_sales", "add_archived_sales", "roll_over"}
+
+STATUS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed",
+          413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def pairs(totals):
+    # JSON has no tuple keys: {(customer_id, model): qty} goes over the wire as [[customer_id, model, qty], ...]
+    return [list(key) + [qty] for key, qty in totals.items()]
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class StorageServer:
+    """Serves one data folder's Storage to several counters over HTTP/1.1 + JSON.
+
+    GET /api/<method>?arg=value runs a read, POST /api/<method> with a JSON
+    object of arguments runs a write. Connections are kept alive between
+    requests. Read responses are cached and the cache is dropped on every
+    write, including writes made to the folder by something other than this
+    server (noticed through the data folder watcher). Storage calls block, so
+    they run on a small thread pool; the event loop only does the I/O.
+    """
+
+    def __init__(self, storage, token=None, workers=4):
+        from watcher import watch
+
+        self.storage = storage
+        self.token = token
+        self.version = 0
+        self._cache = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage")
+        self._watcher = watch(storage.data_dir)
+
+    # Storage calls (run on the executor)
+    def _read(self, method, args):
+        storage = self.storage
+        if method == "version":
+            return self.version
+        if method in ("customer_model_totals", "sales_totals", "daily_cells"):
+            return pairs(getattr(storage, method)(**args))
+        if method == "sales_buckets":
+            return pairs(storage.sales_frame().buckets())
+        if method == "archived_sales":
+            return list(storage.iter_archived_sales(**args))
+        return getattr(storage, method)(**args)
+
+    def _write(self, method, args):
+        return getattr(self.storage, method)(**args)
+
+    def _invalidate(self):
+        self.version += 1
+        self._cache.clear()
+
+    async def handle(self, method, path, query, body, headers):
+        if self.token is not None and not hmac.compare_digest(headers.get("x-bikesales-token", ""), self.token):
+            raise HttpError(401, "missing or wrong token")
+        if not path.startswith("/api/"):
+            raise HttpError(404, f"no such path {path}")
+        name = path[len("/api/"):]
+        loop = asyncio.get_running_loop()
+
+        if self._watcher.changed():  # another process wrote to the data folder
+            self._invalidate()
+
+        if method == "GET":
+            if name not in READS:
+                raise HttpError(404 if name not in WRITES else 405, f"no such read {name}")
+            args = dict(parse_qsl(query, keep_blank_values=True))
+            key = (name, tuple(sorted(args.items())))
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+            version = self.version
+            result = await loop.run_in_executor(self._executor, self._read, name, args)
+            payload = json.dumps({"result": result}).encode()
+            if version == self.version:  # a write landed meanwhile: the result may be stale
+                self._cache[key] = payload
+            return payload
+
+        if method == "POST":
+            if name not in WRITES:
+                raise HttpError(404 if name not in READS else 405, f"no such write {name}")
+            try:
+                args = json.loads(body or b"{}")
+            except ValueError:
+                raise HttpError(400, "body is not JSON") from None
+            if not isinstance(args, dict):
+                raise HttpError(400, "body must be a JSON object of arguments")
+            try:
+                result = await loop.run_in_executor(self._executor, self._write, name, args)
+            finally:
+                self._invalidate()
+            return json.dumps({"result": result}).encode()
+
+        raise HttpError(405, f"{method} not supported")
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        field, value = line.split(":", 1)
+                        headers[field.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                status, payload = 200, b""
+                try:
+                    length = int(headers.get("content-length", "0"))
+                    if length > MAX_BODY:
+                        raise HttpError(413, "request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    url = urlsplit(target)
+                    with measure(f"serve {method} {url.path}"):
+                        payload = await self.handle(method, url.path, url.query, body, headers)
+                except HttpError as error:
+                    status, payload = error.status, json.dumps({"error": str(error)}).encode()
+                except (TypeError, ValueError, KeyError) as error:  # bad arguments for the storage method
+                    status, payload = 400, json.dumps({"error": f"{type(error).__name__}: {error}"}).encode()
+                except asyncio.IncompleteReadError:
+                    return
+                except Exception as error:  # keep serving the other counters
+                    status, payload = 500, json.dumps({"error": f"{type(error).__name__}: {error}"}).encode()
+
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def roll_over_periodically(self):
+        # Counters leave the app open overnight; close the month here, where the data lives
+        loop = asyncio.get_running_loop()
+        compacted = False
+        while True:
+            month = datetime.date.today().strftime("%Y-%m")
+            if self.storage.open_period() != month:
+                await loop.run_in_executor(self._executor, self._write, "roll_over", {"current_month": month})
+                self._invalidate()
+                compacted = False
+            if not compacted:
+                await loop.run_in_executor(self._executor, self.storage.compact)
+                compacted = True
+            await asyncio.sleep(ROLLOVER_CHECK)
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        addresses = ", ".join(f"http://{sock.getsockname()[0]}:{sock.getsockname()[1]}" for sock in server.sockets)
+        print(f"Serving {self.storage.data_dir}/ on {addresses}", file=sys.stderr)
+        rollover = asyncio.create_task(self.roll_over_periodically())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            rollover.cancel()
+            self._executor.shutdown(wait=False)
+
+
+def run_server(storage, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+    try:
+        asyncio.run(StorageServer(storage, token).serve(host, port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,169 @@
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from aggregate import date_to_day, day_to_date
+from metrics import measure
+from rollup import SALES_FIELDS, parse_quantity
+
+MAGIC = b"BSCOLS01"
+HEADER_LENGTH = struct.Struct("<I")
+
+# name, array typecode; every column is padded to a multiple of 4 bytes
+COLUMNS = [
+    ("customer", "i"),
+    ("model", "h"),
+    ("color", "h"),
+    ("day", "i"),
+    ("quantity", "i"),
+]
+
+
+class _Encoder:
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def __call__(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def write_snapshot(csv_path, path, source):
+    """Convert a closed sales CSV into a columnar snapshot file.
+
+    Layout: magic, a little-endian u32 header length, a JSON header (row count,
+    dictionaries, column offsets, the CSV's size/mtime), then each column as a
+    packed native array starting on a 4-byte boundary.
+    """
+    customers, models, colors = _Encoder(), _Encoder(), _Encoder()
+    data = {name: array(typecode) for name, typecode in COLUMNS}
+    days = {}
+
+    with open(csv_path, newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        # A field missing from the header, or from a row torn by a crash, reads as "" like rollover.read_sales
+        width = len(header) + 1
+        c, m, k, q, d = (header.index(field) if field in header else len(header) for field in SALES_FIELDS)
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < width:
+                row += [""] * (width - len(row))
+            date = row[d]
+            if date not in days:
+                days[date] = date_to_day(date)
+            data["customer"].append(customers(row[c]))
+            data["model"].append(models(row[m]))
+            data["color"].append(colors(row[k]))
+            data["day"].append(days[date])
+            data["quantity"].append(parse_quantity(row[q]))
+
+    blobs = []
+    offsets = {}
+    position = 0
+    for name, _typecode in COLUMNS:
+        blob = data[name].tobytes()
+        blob += b"\0" * (-len(blob) % 4)
+        offsets[name] = position
+        position += len(blob)
+        blobs.append(blob)
+
+    header = json.dumps({
+        "rows": len(data["day"]),
+        "byteorder": sys.byteorder,
+        "source": list(source),
+        "customers": customers.values,
+        "models": models.values,
+        "colors": colors.values,
+        "offsets": offsets,
+    }).encode()
+    prefix = MAGIC + HEADER_LENGTH.pack(len(header)) + header
+    prefix += b" " * (-len(prefix) % 8)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(prefix)
+        for blob in blobs:
+            file.write(blob)
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file.
+
+    Columns are memoryviews straight over the mapping, so opening a snapshot
+    costs the header parse only; nothing is copied until a column is read.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self._mmap[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a sales snapshot")
+            (header_length,) = HEADER_LENGTH.unpack_from(self._mmap, len(MAGIC))
+            start = len(MAGIC) + HEADER_LENGTH.size
+            header = json.loads(self._mmap[start:start + header_length])
+        except Exception:
+            self._mmap.close()
+            raise
+
+        self.rows = header["rows"]
+        self.byteorder = header["byteorder"]
+        self.source = tuple(header["source"])
+        self.customers = header["customers"]
+        self.models = header["models"]
+        self.colors = header["colors"]
+        data_start = start + header_length
+        self.data_start = data_start + (-data_start % 8)
+        self.offsets = {name: self.data_start + offset for name, offset in header["offsets"].items()}
+
+    def column(self, name):
+        typecode = dict(COLUMNS)[name]
+        offset = self.offsets[name]
+        size = array(typecode).itemsize * self.rows
+        return memoryview(self._mmap)[offset:offset + size].cast(typecode)
+
+    def rows_as_dicts(self):
+        columns = {name: self.column(name) for name, _typecode in COLUMNS}
+        for i in range(self.rows):
+            yield {
+                "customer_id": self.customers[columns["customer"][i]],
+                "bike_model": self.models[columns["model"][i]],
+                "color": self.colors[columns["color"][i]],
+                "quantity": str(columns["quantity"][i]),
+                "sale_date": day_to_date(columns["day"][i]),
+            }
+
+    def close(self):
+        self._mmap.close()
+
+
+def load_snapshot(csv_path, path):
+    """Open the snapshot for csv_path, regenerating it first if it's missing or stale."""
+    stat = os.stat(csv_path)
+    source = (stat.st_size, stat.st_mtime_ns)
+
+    if os.path.exists(path):
+        try:
+            snapshot = Snapshot(path)
+        except (OSError, ValueError, KeyError):
+            snapshot = None
+        if snapshot is not None:
+            if snapshot.source == source and snapshot.byteorder == sys.byteorder:
+                return snapshot
+            snapshot.close()
+
+    with measure("write snapshot") as span:
+        write_snapshot(csv_path, path, source)
+        span.add(stat.st_size)
+    return Snapshot(path)
@@ -0,0 +1,570 @@
+import csv
+import os
+import sqlite3
+import threading
+from functools import wraps
+
+from aggregate import SalesFrame, customer_mask, daily_cells
+from customers import CustomerRepository
+from journal import Journal, csv_text
+from metrics import timed
+from partitions import PartitionIndex
+from rollover import compact, read_flag, read_sales, roll_over, valid_month
+from rollup import SALES_FIELDS, SalesRollup, parse_quantity
+from watcher import watch
+
+DATA_DIR = "data"
+DB_NAME = "bikestock.db"
+
+
+class Storage:
+    """Interface shared by the storage backends.
+
+    Customer ids are passed around as strings, dates as YYYY-MM-DD strings and
+    months/periods as YYYY-MM strings. Date ranges are inclusive on both ends.
+    """
+
+    # What a call may raise when the data can't be read or written right now (disk, lock, database or network)
+    errors = (OSError,)
+
+    # Customers
+    def customer_names(self):
+        raise NotImplementedError
+
+    def customer_names_by_id(self):
+        raise NotImplementedError
+
+    def customer_name(self, customer_id, default="Unknown"):
+        raise NotImplementedError
+
+    def customer_id(self, name):
+        raise NotImplementedError
+
+    def add_customer(self, name):
+        raise NotImplementedError
+
+    def add_customers(self, names):
+        """Add several customers in one write; returns their ids in order."""
+        raise NotImplementedError
+
+    # Sales (the open period; date lookups also reach into history)
+    def add_sales(self, rows):
+        raise NotImplementedError
+
+    def model_totals_for_date(self, date):
+        raise NotImplementedError
+
+    def last_sale_for_date(self, date):
+        raise NotImplementedError
+
+    def customer_total(self, customer_id, start, end):
+        raise NotImplementedError
+
+    def customer_model_totals(self):
+        raise NotImplementedError
+
+    def sales_frame(self):
+        """The open period as a SalesFrame, for vectorized aggregation."""
+        raise NotImplementedError
+
+    # Sales history (open and archived periods)
+    def sales_totals(self, start, end):
+        raise NotImplementedError
+
+    def daily_cells(self, start, end, customer_id=None):
+        """{(date, bike_model, color): qty} between start and end, for one customer or all of them."""
+        raise NotImplementedError
+
+    # Period archive
+    def open_period(self):
+        raise NotImplementedError
+
+    def add_archived_sales(self, month, rows):
+        """Back-fill sales into an already closed month."""
+        raise NotImplementedError
+
+    def roll_over(self, current_month):
+        raise NotImplementedError
+
+    def compact(self):
+        """Tidy up closed periods; slow, so call it from a background thread. No-op by default."""
+
+    def archived_months(self):
+        raise NotImplementedError
+
+    def iter_archived_sales(self, month):
+        raise NotImplementedError
+
+    def watch(self):
+        """A watcher whose changed() reports writes made by any instance since the last call."""
+        return watch(self.data_dir)
+
+
+def _locked(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class CsvStorage(Storage):
+    """The original layout: customers.csv, sales.csv and sales_YYYY-MM.csv archives.
+
+    The in-memory caches aren't thread-safe, so every call holds one lock; the
+    background loader and the Tk thread may both be reading. Writes go through
+    the data folder journal, which is replayed on startup after a crash.
+    """
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self._lock = threading.RLock()
+        self.customers_path = os.path.join(data_dir, "customers.csv")
+        self.sales_path = os.path.join(data_dir, "sales.csv")
+        self.flag_path = os.path.join(data_dir, "monthly_sales.csv")
+        self.journal = Journal(data_dir)
+        self.journal.recover()
+        self.customers = CustomerRepository(self.customers_path, self.journal)
+        self.sales = SalesRollup(self.sales_path, self.journal)
+        self.history = PartitionIndex(data_dir)
+
+    @timed()
+    @_locked
+    def customer_names(self):
+        return self.customers.names()
+
+    @_locked
+    def customer_names_by_id(self):
+        return self.customers.names_by_id()
+
+    @_locked
+    def customer_name(self, customer_id, default="Unknown"):
+        return self.customers.name_for(customer_id, default)
+
+    @_locked
+    def customer_id(self, name):
+        return self.customers.id_for(name)
+
+    @timed()
+    @_locked
+    def add_customer(self, name):
+        return self.customers.add(name)
+
+    @timed()
+    @_locked
+    def add_customers(self, names):
+        return self.customers.add_many(names)
+
+    @timed()
+    @_locked
+    def add_sales(self, rows):
+        self.sales.append(rows)
+
+    @timed()
+    @_locked
+    def model_totals_for_date(self, date):
+        totals = self.history.model_totals_for_date(date)
+        for model, qty in self.sales.model_totals_for_date(date).items():
+            totals[model] = totals.get(model, 0) + qty
+        return totals
+
+    @timed()
+    @_locked
+    def last_sale_for_date(self, date):
+        return self.sales.last_sale_for_date(date)
+
+    @timed()
+    @_locked
+    def customer_total(self, customer_id, start, end):
+        return (self.sales.customer_total(customer_id, start, end)
+                + self.history.customer_total(customer_id, start, end))
+
+    @timed()
+    @_locked
+    def customer_model_totals(self):
+        return self.sales.customer_model_totals()
+
+    @timed()
+    @_locked
+    def sales_frame(self):
+        return self.sales.frame()
+
+    @timed()
+    @_locked
+    def sales_totals(self, start, end):
+        totals = self.history.customer_model_totals(start, end)
+        for key, qty in self.sales.customer_model_totals_between(start, end).items():
+            totals[key] = totals.get(key, 0) + qty
+        return totals
+
+    @timed()
+    @_locked
+    def daily_cells(self, start, end, customer_id=None):
+        cells = self.history.daily_cells(start, end, customer_id)
+        frame = self.sales.frame()
+        mask = frame.range_mask(start, end)
+        if customer_id is not None:
+            mask &= customer_mask(frame, customer_id)
+        for key, qty in daily_cells(frame, mask).items():
+            cells[key] = cells.get(key, 0) + qty
+        return cells
+
+    @timed()
+    @_locked
+    def roll_over(self, current_month):
+        os.makedirs(self.data_dir, exist_ok=True)
+        roll_over(self.journal, self.history, self.sales_path, self.flag_path, current_month)
+
+    @timed()
+    def compact(self):
+        # Everything is built without the storage lock; it is only held for the renames
+        return compact(self.data_dir, self.journal.lock, self._swap_month)
+
+    @_locked
+    def _swap_month(self, month, install):
+        self.history.release(month)  # unmap the old snapshot first: Windows can't replace a mapped file
+        return install()
+
+    def open_period(self):
+        return read_flag(self.flag_path)
+
+    @timed()
+    def add_archived_sales(self, month, rows):
+        # The month's summary and snapshot notice the changed CSV and rebuild on next use
+        path = self.archive_path(month)
+        with self.journal.lock:
+            self.journal.append([(path, csv_text(SALES_FIELDS, rows, header=not os.path.exists(path)))])
+
+    def archive_path(self, month):
+        return self.history.csv_path(month)
+
+    def archived_months(self):
+        return self.history.months()
+
+    def iter_archived_sales(self, month):
+        path = self.archive_path(month)
+        if not os.path.exists(path):
+            return
+        with open(path, newline="") as file:
+            yield from csv.DictReader(file)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_customers_name ON customers(name);
+
+CREATE TABLE IF NOT EXISTS sales (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL,
+    bike_model TEXT NOT NULL,
+    color TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    sale_date TEXT NOT NULL,
+    period TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sales_date ON sales(sale_date);
+CREATE INDEX IF NOT EXISTS idx_sales_customer ON sales(customer_id, sale_date);
+CREATE INDEX IF NOT EXISTS idx_sales_period ON sales(period);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SqliteStorage(Storage):
+    """Single-file SQLite database in WAL mode.
+
+    Every sale row is tagged with the period (month) that was open when it was
+    recorded, so closing a month only moves the open-period marker instead of
+    moving rows around.
+    """
+
+    errors = (OSError, sqlite3.Error)
+
+    def __init__(self, data_dir=DATA_DIR, db_name=DB_NAME):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, db_name)
+        self._local = threading.local()
+        os.makedirs(data_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _open_period(self, conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'open_period'").fetchone()
+        return row[0] if row else ""
+
+    @timed()
+    def customer_names(self):
+        rows = self._connect().execute("SELECT name FROM customers ORDER BY id")
+        return [name for (name,) in rows]
+
+    def customer_names_by_id(self):
+        rows = self._connect().execute("SELECT id, name FROM customers ORDER BY id")
+        return {str(customer_id): name for customer_id, name in rows}
+
+    def customer_name(self, customer_id, default="Unknown"):
+        try:
+            key = int(customer_id)
+        except (TypeError, ValueError):
+            return default
+        row = self._connect().execute("SELECT name FROM customers WHERE id = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def customer_id(self, name):
+        row = self._connect().execute(
+            "SELECT id FROM customers WHERE name = ? ORDER BY id LIMIT 1", (name,)
+        ).fetchone()
+        return str(row[0]) if row else None
+
+    @timed()
+    def add_customer(self, name):
+        return self.add_customers([name])[0]
+
+    @timed()
+    def add_customers(self, names):
+        with self._connect() as conn:
+            return [str(conn.execute("INSERT INTO customers (name) VALUES (?)", (name,)).lastrowid)
+                    for name in names]
+
+    @timed()
+    def add_sales(self, rows):
+        with self._connect() as conn:
+            self._insert_sales(conn, rows, self._open_period(conn))
+
+    def _insert_sales(self, conn, rows, period):
+        conn.executemany(
+            "INSERT INTO sales (customer_id, bike_model, color, quantity, sale_date, period) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (int(row["customer_id"]), row["bike_model"], row["color"],
+                 parse_quantity(row.get("quantity", 1)), row["sale_date"], period)
+                for row in rows
+            ],
+        )
+
+    @timed()
+    def model_totals_for_date(self, date):
+        rows = self._connect().execute(
+            "SELECT bike_model, SUM(quantity) FROM sales WHERE sale_date = ? "
+            "GROUP BY bike_model ORDER BY MIN(id)",
+            (date,),
+        )
+        return dict(rows.fetchall())
+
+    @timed()
+    def last_sale_for_date(self, date):
+        row = self._connect().execute(
+            "SELECT customer_id, bike_model FROM sales WHERE sale_date = ? ORDER BY id DESC LIMIT 1",
+            (date,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"customer_id": str(row[0]), "bike_model": row[1]}
+
+    @timed()
+    def customer_total(self, customer_id, start, end):
+        try:
+            key = int(customer_id)
+        except (TypeError, ValueError):
+            return 0
+        row = self._connect().execute(
+            "SELECT COALESCE(SUM(quantity), 0) FROM sales "
+            "WHERE customer_id = ? AND sale_date BETWEEN ? AND ?",
+            (key, start, end),
+        ).fetchone()
+        return row[0]
+
+    @timed()
+    def customer_model_totals(self):
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT customer_id, bike_model, SUM(quantity) FROM sales WHERE period = ? "
+            "GROUP BY customer_id, bike_model ORDER BY MIN(id)",
+            (self._open_period(conn),),
+        )
+        return {(str(customer_id), model): qty for customer_id, model, qty in rows}
+
+    @timed()
+    def sales_frame(self):
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT sale_date, customer_id, bike_model, color, SUM(quantity) FROM sales WHERE period = ? "
+            "GROUP BY sale_date, customer_id, bike_model, color",
+            (self._open_period(conn),),
+        )
+        return SalesFrame.from_buckets({
+            (sale_date, str(customer_id), model, color): qty
+            for sale_date, customer_id, model, color, qty in rows
+        })
+
+    @timed()
+    def sales_totals(self, start, end):
+        rows = self._connect().execute(
+            "SELECT customer_id, bike_model, SUM(quantity) FROM sales WHERE sale_date BETWEEN ? AND ? "
+            "GROUP BY customer_id, bike_model",
+            (start, end),
+        )
+        return {(str(customer_id), model): qty for customer_id, model, qty in rows}
+
+    @timed()
+    def daily_cells(self, start, end, customer_id=None):
+        query = ("SELECT sale_date, bike_model, color, SUM(quantity) FROM sales WHERE sale_date BETWEEN ? AND ? "
+                 "AND sale_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'")
+        params = [start, end]
+        if customer_id is not None:
+            try:
+                params.append(int(customer_id))
+            except (TypeError, ValueError):
+                return {}
+            query += " AND customer_id = ?"
+        rows = self._connect().execute(query + " GROUP BY sale_date, bike_model, color", params)
+        return {(sale_date, model, color): qty for sale_date, model, color, qty in rows}
+
+    def open_period(self):
+        return valid_month(self._open_period(self._connect()))
+
+    @timed()
+    def add_archived_sales(self, month, rows):
+        with self._connect() as conn:
+            self._insert_sales(conn, rows, month)
+
+    @timed()
+    def roll_over(self, current_month):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")  # one instance at a time closes the month
+            last_month = self._open_period(conn)
+            if valid_month(last_month) and last_month >= current_month:
+                return
+            # Sales recorded around the flip (or months ago, if periods were skipped) go to their sale_date's
+            # month; those dated this month or later, or not readable as a date, stay in the open period
+            conn.execute(
+                "UPDATE sales SET period = CASE "
+                "WHEN sale_date GLOB '[0-9][0-9][0-9][0-9]-[01][0-9]*' AND substr(sale_date, 1, 7) < ? "
+                "THEN substr(sale_date, 1, 7) ELSE ? END "
+                "WHERE period = ?",
+                (current_month, current_month, last_month),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('open_period', ?)",
+                (current_month,),
+            )
+
+    @timed()
+    def compact(self):
+        conn = self._connect()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA optimize")
+
+    def archived_months(self):
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT DISTINCT period FROM sales WHERE period != ? ORDER BY period",
+            (self._open_period(conn),),
+        )
+        return [period for (period,) in rows if period]
+
+    def iter_archived_sales(self, month):
+        rows = self._connect().execute(
+            "SELECT customer_id, bike_model, color, quantity, sale_date FROM sales "
+            "WHERE period = ? ORDER BY id",
+            (month,),
+        )
+        for customer_id, model, color, qty, sale_date in rows:
+            yield {"customer_id": str(customer_id), "bike_model": model, "color": color,
+                   "quantity": str(qty), "sale_date": sale_date}
+
+
+def migrate_csv_to_sqlite(data_dir=DATA_DIR, db_name=DB_NAME):
+    """One-shot import of the CSV layout into a new SQLite database; returns how many rows were skipped.
+
+    The database is built as <db_name>.tmp and only renamed into place once
+    every row is in, so a failed import leaves the CSV layout in charge (see
+    open_storage) and can simply be run again. Customers or sales whose
+    customer id isn't a number are skipped; other missing fields are read as
+    "", the same as the CSV layout reads them.
+    """
+    db_path = os.path.join(data_dir, db_name)
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists")
+    tmp_name = db_name + ".tmp"
+    tmp_path = os.path.join(data_dir, tmp_name)
+    _remove_database(tmp_path)  # left by an import that was killed
+
+    source = CsvStorage(data_dir)
+    open_period = source.open_period()  # "" if the flag is missing, blank or garbled
+    skipped = 0
+
+    def customer_params(names_by_id):
+        nonlocal skipped
+        for customer_id, name in names_by_id.items():
+            try:
+                yield int(customer_id), name or ""
+            except (TypeError, ValueError):
+                skipped += 1
+
+    def sale_params(rows, period):
+        nonlocal skipped
+        for row in rows:
+            try:
+                customer_id = int(row.get("customer_id"))
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+            yield (customer_id, row.get("bike_model") or "", row.get("color") or "",
+                   parse_quantity(row.get("quantity", 1)), row.get("sale_date") or "", period)
+
+    insert_sales = ("INSERT INTO sales (customer_id, bike_model, color, quantity, sale_date, period) "
+                    "VALUES (?, ?, ?, ?, ?, ?)")
+    conn = SqliteStorage(data_dir, tmp_name)._connect()
+    try:
+        with conn:
+            conn.executemany("INSERT INTO customers (id, name) VALUES (?, ?)",
+                             customer_params(source.customer_names_by_id()))
+            for month in source.archived_months():
+                conn.executemany(insert_sales, sale_params(source.iter_archived_sales(month), month))
+            conn.executemany(insert_sales, sale_params(read_sales(source.sales_path), open_period))
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('open_period', ?)", (open_period,)
+            )
+        conn.execute("PRAGMA journal_mode=DELETE")  # fold the WAL into the file before it is renamed
+        conn.close()
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        conn.close()
+        _remove_database(tmp_path)
+        raise
+    return skipped
+
+
+def _remove_database(path):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def open_storage(data_dir=DATA_DIR, server=None, token=None):
+    """A server's storage if its URL is given, else SQLite once the data folder has been migrated, else the CSVs."""
+    if server:
+        from remote import RemoteStorage  # remote imports this module
+
+        return RemoteStorage(server, token)
+    if os.path.exists(os.path.join(data_dir, DB_NAME)):
+        return SqliteStorage(data_dir)
+    return CsvStorage(data_dir)
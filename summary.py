@@ -0,0 +1,39 @@
+from aggregate import customer_model_matrix
+from catalog import BIKE_MODELS
+from metrics import timed
+
+
+@timed()
+def summary_values(storage, bike_models=BIKE_MODELS):
+    """The Summary view's table: (columns, rows, total_row), one row per customer name."""
+    summary_data = {}
+
+    customers = storage.customer_names_by_id()
+    frame = storage.sales_frame()
+    matrix = customer_model_matrix(frame)
+    customer_totals = matrix.sum(axis=1)
+    model_columns = [frame.models.index(m) if m in frame.models else None for m in bike_models]
+
+    for code, cid in enumerate(frame.customer_ids):
+        if not customer_totals[code]:
+            continue
+        name = customers.get(cid, "Unknown")
+        if name not in summary_data:
+            summary_data[name] = {"total": 0, "models": {m: 0 for m in bike_models}}
+        summary_data[name]["total"] += int(customer_totals[code])
+        for model, column in zip(bike_models, model_columns):
+            if column is not None:
+                summary_data[name]["models"][model] += int(matrix[code, column])
+
+    grand_total_all = int(customer_totals.sum())
+
+    # Build table header
+    columns = ["Customer Name", "Total Bikes"] + bike_models
+
+    rows = []
+    for name, info in summary_data.items():
+        rows.append([name, info["total"]] + [info["models"][model] for model in bike_models])
+
+    # Add grand total row
+    total_row = ["Grand Total: ", grand_total_all] + [""] * len(bike_models)
+    return columns, rows, total_row
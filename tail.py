@@ -0,0 +1,108 @@
+import csv
+import locale
+import os
+
+from metrics import measure
+
+SAMPLE_BYTES = 64
+
+
+class TailReader:
+    """Reads only what has been appended to a CSV file since the last call.
+
+    The checkpoint is the byte offset and row count consumed so far, plus a
+    fingerprint: the file's inode, its header line and the bytes just before
+    the offset. If the file was truncated, replaced (e.g. renamed away by the
+    monthly rollover) or rewritten in the middle, the fingerprint no longer
+    matches and read_new() starts over from the top.
+    """
+
+    def __init__(self, path, encoding=None):
+        self.path = path
+        # Same default as open() in text mode, which is how the app writes the file
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self._clear()
+
+    def _clear(self):
+        self.offset = 0
+        self.rows = 0
+        self.fieldnames = None
+        self._ino = None
+        self._mtime_ns = None
+        self._header = b""
+        self._sample = b""
+
+    def _read_sample(self, file, offset):
+        start = max(len(self._header), offset - SAMPLE_BYTES)
+        file.seek(start)
+        return file.read(offset - start)
+
+    def _still_valid(self, file, stat):
+        if self._ino is None:
+            return False
+        if stat.st_ino != self._ino or stat.st_size < self.offset:
+            return False
+        if stat.st_size == self.offset and stat.st_mtime_ns != self._mtime_ns:
+            return False  # same length but touched: rewritten in place
+        file.seek(0)
+        if file.read(len(self._header)) != self._header:
+            return False
+        return self._read_sample(file, self.offset) == self._sample
+
+    def read_new(self):
+        """Return (reset, rows): reset is True if the rows are the whole file again."""
+        with measure(f"read {os.path.basename(self.path)}") as span:
+            before = self.offset
+            reset, rows = self._read_new()
+            span.add(self.offset - (0 if reset else before), len(rows))
+            return reset, rows
+
+    def _read_new(self):
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            reset = self._ino is not None
+            self._clear()
+            return reset, []
+
+        with file:
+            stat = os.fstat(file.fileno())
+            reset = not self._still_valid(file, stat)
+            if reset:
+                self._clear()
+                file.seek(0)
+                self._header = file.readline()
+                if not self._header.endswith(b"\n"):
+                    self._header = b""  # header still being written
+                    return True, []
+                self.fieldnames = next(csv.reader([self._header.decode(self.encoding)]))
+                self.offset = len(self._header)
+                self._ino = stat.st_ino
+
+            file.seek(self.offset)
+            data = file.read()
+            # Leave a partly written last line for the next call
+            end = data.rfind(b"\n") + 1
+            data = data[:end]
+            rows = []
+            if data:
+                text = data.decode(self.encoding)
+                reader = csv.DictReader(text.splitlines(), fieldnames=self.fieldnames)
+                rows = [row for row in reader if any(row.values())]
+            self._advance(file, stat, end, len(rows))
+            return reset, rows
+
+    def _advance(self, file, stat, consumed, rows):
+        self.offset += consumed
+        self.rows += rows
+        self._mtime_ns = stat.st_mtime_ns
+        self._sample = self._read_sample(file, self.offset)
+
+    def skip_to_end(self, rows):
+        """Mark our own append of `rows` rows as consumed without parsing it again."""
+        with open(self.path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            if self._ino is None:
+                self.read_new()
+                return
+            self._advance(file, stat, stat.st_size - self.offset, rows)
@@ -0,0 +1,18 @@
+from aggregate import SalesFrame, customer_total
+
+
+def frame():
+    return SalesFrame.from_buckets({
+        ("2025-06-03", "1", "CD 70", "Red"): 2,
+        ("3rd June", "2", "CD 70", "Red"): 1,  # free-text date typed at the counter
+    })
+
+
+def test_invalid_bounds_match_nothing():
+    assert customer_total(frame(), "2", "garbage", "garbage") == 0
+    assert customer_total(frame(), "1", "2025-06-01", "2025-06-31") == 0
+
+
+def test_unparseable_sale_dates_are_outside_every_range():
+    assert customer_total(frame(), "2", "0001-01-01", "9999-12-31") == 0
+    assert customer_total(frame(), "1", "0001-01-01", "9999-12-31") == 2
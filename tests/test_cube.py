@@ -0,0 +1,25 @@
+import datetime
+
+from cube import SalesCube
+from storage import CsvStorage, SqliteStorage
+
+ALL = (datetime.date.min.isoformat(), datetime.date.max.isoformat())
+
+
+def sale(customer_id, model, color, quantity, date):
+    return {"customer_id": customer_id, "bike_model": model, "color": color, "quantity": quantity, "sale_date": date}
+
+
+def test_free_text_sale_dates_are_left_out_of_the_cube(tmp_path):
+    for storage in (CsvStorage(str(tmp_path / "csv")), SqliteStorage(str(tmp_path / "sqlite"))):
+        storage.roll_over("2025-06")
+        storage.add_sales([sale("1", "CD 70", "Red", "2", "2025-06-03"), sale("1", "CD 70", "Red", "1", "3rd June")])
+
+        cube = SalesCube.from_cells(storage.daily_cells(*ALL))
+        assert cube.total(*ALL) == 2
+        assert cube.series("2025-06-01", "2025-06-07", "week") == (["2025-05-26", "2025-06-02"], {"CD 70": [0, 2]})
+
+
+def test_from_cells_skips_unparseable_dates():
+    cube = SalesCube.from_cells({("", "CD 70", "Red"): 1, ("2025-06-03", "CD 70", "Red"): 4})
+    assert cube.total("2025-06-01", "2025-06-30", model="CD 70") == 4
@@ -0,0 +1,67 @@
+import os
+
+from journal import Journal, csv_text
+from rollup import SALES_FIELDS
+from storage import CsvStorage
+
+
+def sale(customer_id, model, color, quantity, date):
+    return {"customer_id": customer_id, "bike_model": model, "color": color, "quantity": quantity, "sale_date": date}
+
+
+def crash_mid_apply(data_dir, path, text, torn_bytes):
+    """Leave the data folder as an instance that died while applying one journal entry would."""
+    journal = Journal(str(data_dir))
+    offset = os.path.getsize(path) if os.path.exists(path) else 0
+    journal._write_records([{"path": os.path.basename(path), "offset": offset, "text": text}])
+    with open(path, "a", newline="") as file:
+        file.write(text[:torn_bytes])
+
+
+def test_append_replays_entry_left_by_another_instance(tmp_path):
+    storage = CsvStorage(str(tmp_path))
+    storage.add_sales([sale("1", "CD 70", "Red", "1", "2025-06-03")])
+
+    sales_path = os.path.join(tmp_path, "sales.csv")
+    crash_mid_apply(tmp_path, sales_path, csv_text(SALES_FIELDS, [sale("2", "CD 70", "Black", "1", "2025-06-03")]),
+                    torn_bytes=12)
+
+    # Still open: recovery at startup already happened for this instance
+    storage.add_sales([sale("3", "CG 125", "Red", "2", "2025-06-03")])
+
+    assert storage.model_totals_for_date("2025-06-03") == {"CD 70": 2, "CG 125": 2}
+    with open(sales_path) as file:
+        assert file.read().splitlines()[1:] == [
+            "1,CD 70,Red,1,2025-06-03", "2,CD 70,Black,1,2025-06-03", "3,CG 125,Red,2,2025-06-03"]
+
+
+def test_recover_replays_torn_entry_at_startup(tmp_path):
+    CsvStorage(str(tmp_path)).add_sales([sale("1", "CD 70", "Red", "1", "2025-06-03")])
+    sales_path = os.path.join(tmp_path, "sales.csv")
+    crash_mid_apply(tmp_path, sales_path, csv_text(SALES_FIELDS, [sale("2", "CD 70", "Red", "4", "2025-06-03")]),
+                    torn_bytes=5)
+
+    assert CsvStorage(str(tmp_path)).model_totals_for_date("2025-06-03") == {"CD 70": 5}
+
+
+def test_torn_journal_write_leaves_targets_alone(tmp_path):
+    path = os.path.join(tmp_path, "notes.txt")
+    with open(path, "w") as file:
+        file.write("kept\n")
+    with open(os.path.join(tmp_path, "journal.log"), "w") as file:
+        file.write('{"path": "notes.txt", "offset": 5, "text": "lost\\n"}\n')  # no end marker
+
+    assert Journal(str(tmp_path)).recover() == 0
+    with open(path) as file:
+        assert file.read() == "kept\n"
+
+
+def test_add_customer_after_crashed_batch_gets_a_fresh_id(tmp_path):
+    storage = CsvStorage(str(tmp_path))
+    storage.add_customer("Ali Khan")
+    customers_path = os.path.join(tmp_path, "customers.csv")
+    crash_mid_apply(tmp_path, customers_path, csv_text(["id", "name"], [{"id": 2, "name": "Umer Butt"}]),
+                    torn_bytes=3)
+
+    assert storage.add_customer("Bilal Raza") == "3"
+    assert storage.customer_names() == ["Ali Khan", "Umer Butt", "Bilal Raza"]
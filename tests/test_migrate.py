@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from storage import CsvStorage, SqliteStorage, migrate_csv_to_sqlite, open_storage
+
+HEADER = "customer_id,bike_model,color,quantity,sale_date\n"
+
+
+def data_folder(tmp_path):
+    (tmp_path / "customers.csv").write_text("id,name\n1,Ali Khan\n")
+    (tmp_path / "monthly_sales.csv").write_text("2026-10")
+    (tmp_path / "sales_2026-06.csv").write_text(HEADER + "1,CD 70,Red,2,2026-06-03\n1,CD 7")  # torn by a crash
+    (tmp_path / "sales.csv").write_text(HEADER + "1,CD 70,Blue,1,2026-10-02\nx,CD 70,Red,1,2026-10-02\n")
+    return str(tmp_path)
+
+
+def test_malformed_rows_are_skipped_or_filled(tmp_path):
+    data_dir = data_folder(tmp_path)
+    assert migrate_csv_to_sqlite(data_dir) == 1  # customer "x"
+
+    storage = open_storage(data_dir)
+    assert isinstance(storage, SqliteStorage)
+    assert storage.customer_total("1", "2026-06-01", "2026-06-30") == 2
+    assert storage.customer_total("1", "2026-10-01", "2026-10-31") == 1
+    assert [row["bike_model"] for row in storage.iter_archived_sales("2026-06")] == ["CD 70", "CD 7"]
+    assert not os.path.exists(os.path.join(data_dir, "bikestock.db.tmp"))
+
+
+def test_failed_migration_leaves_the_csv_layout_in_charge(tmp_path, monkeypatch):
+    data_dir = data_folder(tmp_path)
+
+    def unreadable(self, month):
+        raise OSError("disk error")
+        yield
+
+    monkeypatch.setattr(CsvStorage, "iter_archived_sales", unreadable)
+    with pytest.raises(OSError):
+        migrate_csv_to_sqlite(data_dir)
+    assert sorted(name for name in os.listdir(data_dir) if name.startswith("bikestock")) == []
+    assert isinstance(open_storage(data_dir), CsvStorage)
+
+    monkeypatch.undo()
+    migrate_csv_to_sqlite(data_dir)  # and it can be run again
+    assert open_storage(data_dir).customer_total("1", "2026-06-01", "2026-06-30") == 2
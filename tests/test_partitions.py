@@ -0,0 +1,38 @@
+from storage import CsvStorage
+
+HEADER = "customer_id,bike_model,color,quantity,sale_date\n"
+
+
+def archive(tmp_path, month, text):
+    (tmp_path / f"sales_{month}.csv").write_text(HEADER + text)
+
+
+def test_torn_archive_row_does_not_break_history(tmp_path):
+    archive(tmp_path, "2026-06", "1,CD 70,Red,2,2026-06-03\n1,CD 7")  # the old app crashed mid-write
+    storage = CsvStorage(str(tmp_path))
+    storage.roll_over("2026-10")
+
+    assert storage.model_totals_for_date("2026-10-18") == {}
+    assert storage.customer_total("1", "2026-10-18", "2026-10-18") == 0
+    assert storage.customer_total("1", "2026-06-01", "2026-06-30") == 2
+
+
+def test_free_text_dates_do_not_hide_the_rest_of_the_month(tmp_path):
+    archive(tmp_path, "2026-06", "1,CD 70,Red,5,2026-06-03\n1,CD 70,Red,1,3rd June\n")
+    storage = CsvStorage(str(tmp_path))
+    storage.roll_over("2026-10")
+
+    # A range covering the whole month uses the summary, one cutting into it scans the snapshot; both skip "3rd June"
+    assert storage.customer_total("1", "2026-06-01", "2026-06-30") == 5
+    assert storage.customer_total("1", "2026-06-02", "2026-06-03") == 5
+    assert storage.model_totals_for_date("2026-06-03") == {"CD 70": 5}
+    assert storage.daily_cells("2026-06-01", "2026-06-30") == {("2026-06-03", "CD 70", "Red"): 5}
+    assert storage.sales_totals("2026-06-01", "2026-06-30") == {("1", "CD 70"): 5}
+
+
+def test_archive_with_only_free_text_dates_has_no_span(tmp_path):
+    archive(tmp_path, "2026-06", "1,CD 70,Red,1,3rd June\n")
+    storage = CsvStorage(str(tmp_path))
+    storage.roll_over("2026-10")
+
+    assert storage.customer_total("1", "0001-01-01", "9999-12-31") == 0
@@ -0,0 +1,47 @@
+import http.client
+import socket
+import threading
+
+import pytest
+
+from remote import RemoteStorage
+
+
+def dropping_server():
+    """A server that reads each request and hangs up without answering; returns (port, requests seen)."""
+    listener = socket.create_server(("127.0.0.1", 0))
+    seen = []
+
+    def serve():
+        while True:
+            conn, _address = listener.accept()
+            with conn:
+                seen.append(conn.recv(65536).split(b" ", 2)[:2])
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener.getsockname()[1], seen
+
+
+def test_reads_are_retried_but_writes_are_not():
+    port, seen = dropping_server()
+    storage = RemoteStorage(f"127.0.0.1:{port}", timeout=5)
+
+    with pytest.raises(http.client.RemoteDisconnected):
+        storage.customer_names()
+    assert seen == [[b"GET", b"/api/customer_names"]] * 2
+
+    del seen[:]
+    with pytest.raises(http.client.RemoteDisconnected):
+        storage.add_sales([{"customer_id": "1", "bike_model": "CD 70", "color": "Red", "quantity": "1",
+                            "sale_date": "2026-10-18"}])
+    assert seen == [[b"POST", b"/api/add_sales"]]
+
+
+def test_server_down_raises_one_of_the_storage_errors():
+    listener = socket.create_server(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    listener.close()
+    storage = RemoteStorage(f"127.0.0.1:{port}")
+
+    with pytest.raises(storage.errors):
+        storage.customer_total("1", "2026-10-18", "2026-10-18")
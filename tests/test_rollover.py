@@ -0,0 +1,90 @@
+import csv
+import os
+
+from rollup import SALES_FIELDS
+from storage import CsvStorage
+
+
+def write_sales(path, rows):
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(SALES_FIELDS)
+        writer.writerows(rows)
+
+
+def read_rows(path):
+    with open(path, newline="") as file:
+        return [row[-1] for row in csv.reader(file)][1:]
+
+
+def test_blank_flag_and_skipped_months_split_by_sale_date(tmp_path):
+    write_sales(tmp_path / "sales.csv", [["1", "CD 70", "Red", "1", "2026-06-30"],
+                                         ["2", "CD 70", "Red", "1", "2026-08-02"],
+                                         ["3", "CD 70", "Red", "1", "2026-10-01"],
+                                         ["4", "CD 70", "Red", "1", "3rd Oct"]])
+    (tmp_path / "monthly_sales.csv").write_text("  \n")
+    storage = CsvStorage(str(tmp_path))
+    storage.roll_over("2026-10")
+
+    assert not os.path.exists(tmp_path / "sales_.csv")
+    assert read_rows(tmp_path / "sales_2026-06.csv") == ["2026-06-30"]
+    assert read_rows(tmp_path / "sales_2026-08.csv") == ["2026-08-02"]
+    assert read_rows(tmp_path / "sales.csv") == ["2026-10-01", "3rd Oct"]
+    assert storage.open_period() == "2026-10"
+
+    before = {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path) if name.endswith(".csv")}
+    storage.roll_over("2026-10")
+    assert before == {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path) if name.endswith(".csv")}
+
+
+def test_orphan_is_split_when_the_flag_is_already_current(tmp_path):
+    # What the old rollover left behind: sales_.csv next to a flag it had already moved on
+    write_sales(tmp_path / "sales_.csv", [["1", "CD 70", "Red", "3", "2026-09-05"],
+                                          ["2", "CD 70", "Red", "2", "2026-10-02"]])
+    write_sales(tmp_path / "sales.csv", [["3", "CD 70", "Red", "1", "2026-10-03"]])
+    (tmp_path / "monthly_sales.csv").write_text("2026-10")
+    storage = CsvStorage(str(tmp_path))
+    storage.roll_over("2026-10")
+
+    assert not os.path.exists(tmp_path / "sales_.csv")
+    assert storage.customer_total("1", "2026-09-01", "2026-09-30") == 3
+    assert storage.customer_total("2", "2026-10-01", "2026-10-31") == 2
+    assert read_rows(tmp_path / "sales.csv") == ["2026-10-03", "2026-10-02"]
+
+
+def test_compact_sorts_and_checksums_closed_months(tmp_path):
+    from rollover import verify
+
+    write_sales(tmp_path / "sales_2026-06.csv", [["1", "CD 70", "Red", "1", "2026-06-30"],
+                                                 ["2", "CD 70", "Red", "1", "2026-06-01"]])
+    storage = CsvStorage(str(tmp_path))
+    assert storage.compact() == ["2026-06"]
+    assert storage.compact() == []
+    assert read_rows(tmp_path / "sales_2026-06.csv") == ["2026-06-01", "2026-06-30"]
+    assert list(verify(str(tmp_path))) == [("2026-06", "ok")]
+
+    # The snapshot and summary were swapped in with the CSV, so nothing is rebuilt on the next query
+    storage.history.build = None
+    assert storage.customer_total("2", "2026-06-01", "2026-06-30") == 1
+    assert storage.customer_total("2", "2026-06-01", "2026-06-15") == 1
+
+    path = tmp_path / "sales_2026-06.csv"
+    path.write_bytes(path.read_bytes().replace(b"Red", b"Rad", 1))
+    assert list(verify(str(tmp_path))) == [("2026-06", "corrupt")]
+
+
+def test_garbled_flag_does_not_stop_sqlite_rollovers(tmp_path):
+    from storage import SqliteStorage, migrate_csv_to_sqlite
+
+    write_sales(tmp_path / "sales.csv", [["1", "CD 70", "Red", "1", "2026-09-30"],
+                                         ["1", "CD 70", "Red", "2", "2026-10-01"]])
+    (tmp_path / "customers.csv").write_text("id,name\n1,Ali Khan\n")
+    (tmp_path / "monthly_sales.csv").write_text("garbled")
+    migrate_csv_to_sqlite(str(tmp_path))
+    storage = SqliteStorage(str(tmp_path))
+    assert storage.open_period() == ""
+
+    storage.roll_over("2026-10")
+    assert storage.open_period() == "2026-10"
+    assert storage.archived_months() == ["2026-09"]
+    assert storage.customer_model_totals() == {("1", "CD 70"): 2}
@@ -0,0 +1,16 @@
+import random
+
+from bench import customer_names
+from search import CustomerIndex
+
+
+def test_similar_finds_the_newest_name_in_a_large_index():
+    names = customer_names(100000, random.Random(0)) + ["Khawaja Motors"]
+    index = CustomerIndex(names)
+    assert index.similar("Khawaja Motor")[0] == "Khawaja Motors"
+
+
+def test_exists_ignores_case_and_spacing():
+    index = CustomerIndex(["Khawaja Motors"])
+    assert index.exists("  khawaja   MOTORS ")
+    assert not index.exists("Khawaja Motor")
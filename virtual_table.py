@@ -0,0 +1,141 @@
+import customtkinter as ctk
+
+
+def _sort_key(value):
+    # Numbers sort numerically, text case-insensitively, and numbers before text
+    if isinstance(value, (int, float)):
+        return (0, value, "")
+    return (1, 0, str(value).lower())
+
+
+class VirtualTable(ctk.CTkFrame):
+    """Scrollable table that only has widgets for the rows on screen.
+
+    A fixed pool of row labels (enough to fill the viewport) is reused while
+    scrolling: moving the view just rewrites their text. Clicking a header
+    sorts by that column; clicking it again reverses the order. The footer
+    row stays pinned below the body.
+    """
+
+    def __init__(self, master, columns, rows, footer=None, row_height=32, font=("Segoe UI", 16),
+                 header_color="#DC2626", colors=("#1E1E1E", "#2A2A2A"), column_width=140, **kwargs):
+        super().__init__(master, **kwargs)
+        self.columns = list(columns)
+        self.rows = list(rows)
+        self.row_height = row_height
+        self.font = font
+        self.colors = colors
+        self.column_width = column_width
+        self.first_row = 0
+        self.sort_column = None
+        self.sort_reverse = False
+        self._pool = []
+
+        self.grid_rowconfigure(1, weight=1)
+        for col in range(len(self.columns)):
+            self.grid_columnconfigure(col, weight=1, minsize=column_width)
+
+        self._header_buttons = []
+        for col, title in enumerate(self.columns):
+            btn = ctk.CTkButton(self, text=title, font=font, fg_color=header_color, hover_color="#B91C1C",
+                                corner_radius=0, height=row_height, command=lambda c=col: self.sort_by(c))
+            btn.grid(row=0, column=col, sticky="nsew")
+            self._header_buttons.append(btn)
+
+        self.body = ctk.CTkFrame(self, fg_color=colors[0], corner_radius=0)
+        self.body.grid(row=1, column=0, columnspan=len(self.columns), sticky="nsew")
+        for col in range(len(self.columns)):
+            self.body.grid_columnconfigure(col, weight=1, minsize=column_width)
+        self.body.grid_propagate(False)
+
+        self.scrollbar = ctk.CTkScrollbar(self, orientation="vertical", command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=len(self.columns), rowspan=3, sticky="ns")
+
+        self._footer_labels = []
+        if footer is not None:
+            for col, value in enumerate(footer):
+                label = ctk.CTkLabel(self, text=str(value), font=font, fg_color=header_color,
+                                     text_color="white", corner_radius=0, height=row_height)
+                label.grid(row=2, column=col, sticky="nsew")
+                self._footer_labels.append(label)
+
+        self.body.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.body)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", lambda e: self.scroll_to(self.first_row - 3))
+        widget.bind("<Button-5>", lambda e: self.scroll_to(self.first_row + 3))
+
+    def _on_wheel(self, event):
+        self.scroll_to(self.first_row - int(event.delta / 120) * 3)
+
+    def _visible_count(self):
+        return max(1, self.body.winfo_height() // self.row_height)
+
+    def _on_resize(self, event=None):
+        needed = self._visible_count()
+        # Grow or shrink the widget pool to match the viewport, never the data
+        while len(self._pool) < needed:
+            index = len(self._pool)
+            cells = []
+            for col in range(len(self.columns)):
+                label = ctk.CTkLabel(self.body, text="", font=self.font, height=self.row_height,
+                                     corner_radius=0, anchor="w" if col == 0 else "center")
+                label.grid(row=index, column=col, sticky="nsew", padx=(8 if col == 0 else 0, 0))
+                self._bind_wheel(label)
+                cells.append(label)
+            self._pool.append(cells)
+        while len(self._pool) > needed:
+            for label in self._pool.pop():
+                label.destroy()
+        self.scroll_to(self.first_row)
+
+    def _on_scrollbar(self, *args):
+        visible = self._visible_count()
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            step = visible if args[2] == "pages" else 1
+            self.scroll_to(self.first_row + int(args[1]) * step)
+
+    def scroll_to(self, first_row):
+        visible = self._visible_count()
+        self.first_row = max(0, min(first_row, len(self.rows) - visible))
+
+        for offset, cells in enumerate(self._pool):
+            index = self.first_row + offset
+            row = self.rows[index] if index < len(self.rows) else None
+            color = self.colors[index % len(self.colors)]
+            for col, label in enumerate(cells):
+                label.configure(text="" if row is None else str(row[col]), fg_color=color)
+
+        if self.rows:
+            end = min(len(self.rows), self.first_row + visible)
+            self.scrollbar.set(self.first_row / len(self.rows), end / len(self.rows))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def sort_by(self, column):
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = column != 0  # biggest numbers first, names A-Z
+        self.rows.sort(key=lambda row: _sort_key(row[column]), reverse=self.sort_reverse)
+
+        for col, btn in enumerate(self._header_buttons):
+            arrow = ""
+            if col == column:
+                arrow = " ▼" if self.sort_reverse else " ▲"
+            btn.configure(text=self.columns[col] + arrow)
+        self.scroll_to(0)
+
+    def set_rows(self, rows, footer=None):
+        self.rows = list(rows)
+        if footer is not None:
+            for label, value in zip(self._footer_labels, footer):
+                label.configure(text=str(value))
+        if self.sort_column is not None:
+            self.rows.sort(key=lambda row: _sort_key(row[self.sort_column]), reverse=self.sort_reverse)
+        self.scroll_to(self.first_row)
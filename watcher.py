@@ -0,0 +1,97 @@
+import ctypes
+import ctypes.util
+import os
+import sys
+
+# inotify(7) event bits we care about: anything that changes a file's contents or the listing
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+class PollWatcher:
+    """Detects changes in a folder by comparing the (mtime, size) of its files.
+
+    Used where inotify isn't available (Windows, macOS). One poll is a single
+    scandir of the data folder, cheap enough to run from the Tk loop.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._signature = self._scan()
+
+    def _scan(self):
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return None
+        signature = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:  # removed between the listing and the stat
+                continue
+            signature.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        return frozenset(signature)
+
+    def changed(self):
+        signature = self._scan()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        return True
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Detects changes in a folder with Linux inotify.
+
+    The descriptor is non-blocking, so changed() just drains whatever events
+    the kernel queued since the last call; no thread is needed.
+    """
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, "inotify_add_watch failed", directory)
+        self.directory = directory
+
+    def changed(self):
+        changed = False
+        while True:
+            try:
+                if not os.read(self._fd, 65536):
+                    break
+            except BlockingIOError:
+                break
+            changed = True
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def watch(directory):
+    """A watcher for `directory`: inotify on Linux, mtime polling everywhere else."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError):  # no libc symbol, watch limit reached, ...
+            pass
+    return PollWatcher(directory)